@@ -0,0 +1,23 @@
+"""Index devices by tenant and last_seen_at for fleet health
+
+Revision ID: 20261019_01
+Revises: 20240201_01
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from __future__ import annotations
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "20261019_01"
+down_revision = "20240201_01"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_devices_tenant_last_seen", "devices", ["tenant_id", "last_seen_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_devices_tenant_last_seen", table_name="devices")
@@ -0,0 +1,48 @@
+"""Daily alert rollup for the dashboard trend
+
+Revision ID: 20261019_02
+Revises: 20261019_01
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "20261019_02"
+down_revision = "20261019_01"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "alert_daily_counts",
+        sa.Column("tenant_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("tenants.id"), primary_key=True),
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("opened", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("resolved", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+    # Backfill from alert history, bucketing by UTC day like the API does.
+    op.execute(
+        """
+        INSERT INTO alert_daily_counts (tenant_id, day, opened, resolved)
+        SELECT tenant_id, day, SUM(opened), SUM(resolved)
+        FROM (
+            SELECT tenant_id, (created_at AT TIME ZONE 'UTC')::date AS day, 1 AS opened, 0 AS resolved
+            FROM alerts
+            UNION ALL
+            SELECT tenant_id, (resolved_at AT TIME ZONE 'UTC')::date AS day, 0 AS opened, 1 AS resolved
+            FROM alerts
+            WHERE resolved_at IS NOT NULL
+        ) AS events
+        GROUP BY tenant_id, day
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("alert_daily_counts")
@@ -0,0 +1,53 @@
+"""One active alert per device metric
+
+Revision ID: 20261019_03
+Revises: 20261019_02
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "20261019_03"
+down_revision = "20261019_02"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Earlier per-item evaluation could race into duplicate open alerts; keep the newest of each
+    # pair and resolve the rest, counting them in the daily rollup like any other resolve.
+    op.execute(
+        """
+        WITH duplicates AS (
+            UPDATE alerts
+            SET status = 'resolved', resolved_at = now()
+            WHERE id IN (
+                SELECT id
+                FROM (
+                    SELECT id, row_number() OVER (PARTITION BY device_id, metric_key ORDER BY created_at DESC) AS position
+                    FROM alerts
+                    WHERE status IN ('open', 'acked')
+                ) AS ranked
+                WHERE position > 1
+            )
+            RETURNING tenant_id, (resolved_at AT TIME ZONE 'UTC')::date AS day
+        )
+        INSERT INTO alert_daily_counts (tenant_id, day, opened, resolved)
+        SELECT tenant_id, day, 0, count(*) FROM duplicates GROUP BY tenant_id, day
+        ON CONFLICT (tenant_id, day) DO UPDATE SET resolved = alert_daily_counts.resolved + excluded.resolved
+        """
+    )
+    op.create_index(
+        "ux_alerts_active_device_metric",
+        "alerts",
+        ["device_id", "metric_key"],
+        unique=True,
+        postgresql_where=sa.text("status IN ('open', 'acked')"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ux_alerts_active_device_metric", table_name="alerts")
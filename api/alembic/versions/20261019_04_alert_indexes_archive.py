@@ -0,0 +1,98 @@
+"""Alert list indexes and resolved-alert archive
+
+Revision ID: 20261019_04
+Revises: 20261019_03
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "20261019_04"
+down_revision = "20261019_03"
+branch_labels = None
+depends_on = None
+
+alert_status = postgresql.ENUM("open", "acked", "resolved", name="alertstatus", create_type=False)
+alert_severity = postgresql.ENUM("warning", "critical", name="alertseverity", create_type=False)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "alerts_archive",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("tenant_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("device_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("metric_key", sa.String(length=50), nullable=False),
+        sa.Column("status", alert_status, nullable=False),
+        sa.Column("severity", alert_severity, nullable=False),
+        sa.Column("message", sa.String(length=512), nullable=False),
+        sa.Column("value", sa.Float(), nullable=True),
+        sa.Column("threshold_min", sa.Float(), nullable=True),
+        sa.Column("threshold_max", sa.Float(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("acked_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("resolved_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("archived_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index("ix_alerts_archive_tenant_created", "alerts_archive", ["tenant_id", "created_at"])
+
+    # Built concurrently so a large alerts table keeps taking writes while the indexes build.
+    with op.get_context().autocommit_block():
+        # list_alerts: tenant scope, optional status filter, newest first.
+        op.create_index(
+            "ix_alerts_tenant_created",
+            "alerts",
+            ["tenant_id", sa.text("created_at DESC")],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_alerts_tenant_status_created",
+            "alerts",
+            ["tenant_id", "status", sa.text("created_at DESC")],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        # device_id filter on list_alerts, and the ON DELETE CASCADE from devices.
+        op.create_index(
+            "ix_alerts_device_created",
+            "alerts",
+            ["device_id", sa.text("created_at DESC")],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        # Retention job: oldest resolved alerts first.
+        op.create_index(
+            "ix_alerts_resolved_at",
+            "alerts",
+            ["resolved_at"],
+            postgresql_where=sa.text("status = 'resolved'"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        # (tenant_id, status) is a prefix of ix_alerts_tenant_status_created.
+        op.drop_index("ix_alerts_tenant_status", table_name="alerts", postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_alerts_tenant_status",
+            "alerts",
+            ["tenant_id", "status"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        for name in (
+            "ix_alerts_resolved_at",
+            "ix_alerts_device_created",
+            "ix_alerts_tenant_status_created",
+            "ix_alerts_tenant_created",
+        ):
+            op.drop_index(name, table_name="alerts", postgresql_concurrently=True, if_exists=True)
+    op.drop_index("ix_alerts_archive_tenant_created", table_name="alerts_archive")
+    op.drop_table("alerts_archive")
@@ -0,0 +1,42 @@
+"""Per-tenant alert counters by status and severity
+
+Revision ID: 20261019_05
+Revises: 20261019_04
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "20261019_05"
+down_revision = "20261019_04"
+branch_labels = None
+depends_on = None
+
+alert_status = postgresql.ENUM("open", "acked", "resolved", name="alertstatus", create_type=False)
+alert_severity = postgresql.ENUM("warning", "critical", name="alertseverity", create_type=False)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "alert_counters",
+        sa.Column("tenant_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("tenants.id"), primary_key=True),
+        sa.Column("status", alert_status, primary_key=True),
+        sa.Column("severity", alert_severity, primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.execute(
+        """
+        INSERT INTO alert_counters (tenant_id, status, severity, count)
+        SELECT tenant_id, status, severity, count(*)
+        FROM alerts
+        GROUP BY tenant_id, status, severity
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("alert_counters")
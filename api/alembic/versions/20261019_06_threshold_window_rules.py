@@ -0,0 +1,31 @@
+"""Sliding-window aggregate threshold rules
+
+Revision ID: 20261019_06
+Revises: 20261019_05
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "20261019_06"
+down_revision = "20261019_05"
+branch_labels = None
+depends_on = None
+
+threshold_aggregate = postgresql.ENUM("last", "mean", "min", "max", name="thresholdaggregate", create_type=False)
+
+
+def upgrade() -> None:
+    threshold_aggregate.create(op.get_bind(), checkfirst=True)
+    op.add_column("thresholds", sa.Column("aggregate", threshold_aggregate, nullable=False, server_default="last"))
+    op.add_column("thresholds", sa.Column("window_sec", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("thresholds", "window_sec")
+    op.drop_column("thresholds", "aggregate")
+    threshold_aggregate.drop(op.get_bind(), checkfirst=True)
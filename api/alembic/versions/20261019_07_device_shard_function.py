@@ -0,0 +1,49 @@
+"""SQL port of device_shard() for sharded monitoring snapshots
+
+Revision ID: 20261019_07
+Revises: 20261019_06
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from __future__ import annotations
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "20261019_07"
+down_revision = "20261019_06"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Mirrors app.services.sharding.device_shard: jump hash over the UUID's low 64 bits. Unsigned
+    # 64-bit wraparound is done in numeric, the jump step in float8 exactly as Python floats do.
+    op.execute(
+        """
+        CREATE FUNCTION device_shard(device_id uuid, shard_count integer) RETURNS integer
+        LANGUAGE plpgsql IMMUTABLE STRICT PARALLEL SAFE AS $$
+        DECLARE
+            key numeric := ('x' || right(replace(device_id::text, '-', ''), 16))::bit(64)::bigint;
+            bucket bigint := -1;
+            jump bigint := 0;
+        BEGIN
+            IF shard_count <= 1 THEN
+                RETURN 0;
+            END IF;
+            IF key < 0 THEN
+                key := key + 18446744073709551616;
+            END IF;
+            WHILE jump < shard_count LOOP
+                bucket := jump;
+                key := mod(key * 2862933555777941757 + 1, 18446744073709551616);
+                jump := floor((bucket + 1) * (2147483648::float8 / (floor(key / 8589934592) + 1)::float8));
+            END LOOP;
+            RETURN bucket;
+        END
+        $$
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP FUNCTION IF EXISTS device_shard(uuid, integer)")
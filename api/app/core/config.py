@@ -22,6 +22,20 @@ class Settings(BaseSettings):
     influx_token: str = "dev-token"
     influx_org: str = "iot-org"
     influx_bucket: str = "iot_telemetry"
+    influx_query_timeout_sec: float = 10.0
+    influx_pool_size: int = 20
+    influx_query_profiling: bool = False
+    influx_slow_query_ms: float = 500.0
+
+    dashboard_reconcile_sec: int = 300
+    dashboard_query_workers: int = 8
+    dashboard_part_timeout_sec: float = 5.0
+
+    alert_retention_days: int = 90
+    alert_archive_interval_sec: int = 3600
+    alert_archive_batch_size: int = 5000
+    alert_counter_repair_sec: int = 3600
+    alert_stream_buffer: int = 1000
 
     mqtt_host: str = "mosquitto"
     mqtt_port: int = 1883
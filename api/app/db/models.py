@@ -6,13 +6,17 @@ import uuid
 from sqlalchemy import (
     Boolean,
     Column,
+    Date,
     DateTime,
     Enum as SqlEnum,
     Float,
     ForeignKey,
+    Index,
+    Integer,
     String,
     UniqueConstraint,
     func,
+    text,
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
@@ -53,6 +57,7 @@ class DeviceStatus(str, enum.Enum):
 
 class Device(Base):
     __tablename__ = "devices"
+    __table_args__ = (Index("ix_devices_tenant_last_seen", "tenant_id", "last_seen_at"),)
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     tenant_id = Column(UUID(as_uuid=True), ForeignKey("tenants.id"), nullable=False, index=True)
@@ -70,6 +75,13 @@ class Device(Base):
     alerts = relationship("Alert", back_populates="device", cascade="all, delete-orphan")
 
 
+class ThresholdAggregate(str, enum.Enum):
+    last = "last"
+    mean = "mean"
+    min = "min"
+    max = "max"
+
+
 class DeviceThreshold(Base):
     __tablename__ = "thresholds"
     __table_args__ = (UniqueConstraint("device_id", "metric_key", name="uq_threshold_metric"),)
@@ -81,6 +93,9 @@ class DeviceThreshold(Base):
     max_value = Column(Float, nullable=True)
     hysteresis = Column(Float, nullable=True)
     enabled = Column(Boolean, nullable=False, default=True)
+    # "last" compares the latest sample; the others compare that aggregate over window_sec.
+    aggregate = Column(SqlEnum(ThresholdAggregate), nullable=False, default=ThresholdAggregate.last, server_default="last")
+    window_sec = Column(Integer, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
@@ -98,8 +113,25 @@ class AlertSeverity(str, enum.Enum):
     critical = "critical"
 
 
+ACTIVE_ALERT_STATUSES = (AlertStatus.open, AlertStatus.acked)
+
+
 class Alert(Base):
     __tablename__ = "alerts"
+    __table_args__ = (
+        # At most one open/acked alert per device metric; lets evaluations upsert with ON CONFLICT.
+        Index(
+            "ux_alerts_active_device_metric",
+            "device_id",
+            "metric_key",
+            unique=True,
+            postgresql_where=text("status IN ('open', 'acked')"),
+        ),
+        Index("ix_alerts_tenant_created", "tenant_id", text("created_at DESC")),
+        Index("ix_alerts_tenant_status_created", "tenant_id", "status", text("created_at DESC")),
+        Index("ix_alerts_device_created", "device_id", text("created_at DESC")),
+        Index("ix_alerts_resolved_at", "resolved_at", postgresql_where=text("status = 'resolved'")),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     tenant_id = Column(UUID(as_uuid=True), ForeignKey("tenants.id"), nullable=False, index=True)
@@ -116,3 +148,42 @@ class Alert(Base):
     resolved_at = Column(DateTime(timezone=True), nullable=True)
 
     device = relationship("Device", back_populates="alerts")
+
+
+class AlertDailyCount(Base):
+    __tablename__ = "alert_daily_counts"
+
+    tenant_id = Column(UUID(as_uuid=True), ForeignKey("tenants.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    opened = Column(Integer, nullable=False, default=0)
+    resolved = Column(Integer, nullable=False, default=0)
+
+
+class AlertCounter(Base):
+    __tablename__ = "alert_counters"
+
+    tenant_id = Column(UUID(as_uuid=True), ForeignKey("tenants.id"), primary_key=True)
+    status = Column(SqlEnum(AlertStatus), primary_key=True)
+    severity = Column(SqlEnum(AlertSeverity), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+# Resolved alerts moved out of ``alerts`` once older than ``alert_retention_days``.
+class AlertArchive(Base):
+    __tablename__ = "alerts_archive"
+    __table_args__ = (Index("ix_alerts_archive_tenant_created", "tenant_id", "created_at"),)
+
+    id = Column(UUID(as_uuid=True), primary_key=True)
+    tenant_id = Column(UUID(as_uuid=True), nullable=False)
+    device_id = Column(UUID(as_uuid=True), nullable=False)
+    metric_key = Column(String(50), nullable=False)
+    status = Column(SqlEnum(AlertStatus), nullable=False)
+    severity = Column(SqlEnum(AlertSeverity), nullable=False)
+    message = Column(String(512), nullable=False)
+    value = Column(Float, nullable=True)
+    threshold_min = Column(Float, nullable=True)
+    threshold_max = Column(Float, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    acked_at = Column(DateTime(timezone=True), nullable=True)
+    resolved_at = Column(DateTime(timezone=True), nullable=True)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
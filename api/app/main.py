@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import os
 import time
@@ -12,10 +13,15 @@ from .core.config import get_settings
 from .core.errors import error_payload
 from .routes.alerts import router as alerts_router
 from .routes.auth import router as auth_router
-from .routes.dashboard import router as dashboard_router
+from .routes.dashboard import load_dashboard_snapshot, router as dashboard_router
 from .routes.devices import router as devices_router
 from .routes.health import router as health_router
 from .routes.internal import router as internal_router
+from .routes.stream import router as stream_router
+from .services.alert_archive import run_archiver
+from .services.alert_counters import run_counter_repair
+from .services.dashboard_state import dashboard_state
+from .services.telemetry_store import get_telemetry_store
 
 settings = get_settings()
 logger = logging.getLogger("iot_portal.api")
@@ -84,9 +90,39 @@ async def log_requests(request: Request, call_next):
     return response
 
 
+@app.on_event("startup")
+async def start_background_tasks() -> None:
+    app.state.background_tasks = [
+        asyncio.create_task(
+            dashboard_state.run_reconciler(load_dashboard_snapshot, settings.dashboard_reconcile_sec)
+        ),
+        asyncio.create_task(
+            run_archiver(
+                settings.alert_retention_days,
+                settings.alert_archive_batch_size,
+                settings.alert_archive_interval_sec,
+            )
+        ),
+        asyncio.create_task(run_counter_repair(settings.alert_counter_repair_sec)),
+    ]
+
+
+@app.on_event("shutdown")
+async def stop_background_tasks() -> None:
+    for task in getattr(app.state, "background_tasks", []):
+        task.cancel()
+    await asyncio.gather(*getattr(app.state, "background_tasks", []), return_exceptions=True)
+
+
+@app.on_event("shutdown")
+async def close_telemetry_store() -> None:
+    await get_telemetry_store().aclose()
+
+
 app.include_router(health_router)
 app.include_router(auth_router)
 app.include_router(devices_router)
 app.include_router(alerts_router)
 app.include_router(dashboard_router)
 app.include_router(internal_router)
+app.include_router(stream_router)
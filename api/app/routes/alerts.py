@@ -1,20 +1,36 @@
 from __future__ import annotations
 
+import base64
+import binascii
+import threading
+import time
 from datetime import datetime, timezone
+from typing import Dict, Tuple
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, Query, status
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, Query, Request, Response, status
+from sqlalchemy import func, select, tuple_, update
 from sqlalchemy.orm import Session, selectinload
 
 from ..core.errors import api_error
-from ..db.models import Alert, AlertSeverity, AlertStatus, User
+from ..db.models import ACTIVE_ALERT_STATUSES, Alert, AlertSeverity, AlertStatus, User
 from ..db.session import get_db
 from ..routes.auth import get_current_user
-from ..schemas.alert import AlertListResponse, AlertResponse, AlertSummary
+from ..schemas.alert import AlertBulkRequest, AlertBulkResponse, AlertListResponse, AlertResponse, AlertSummary
+from ..services.alert_counters import AlertCounters, read_alert_counts
+from ..services.alert_events import ACKED, RESOLVED, AlertEvent, alert_events
+from ..services.alert_rollup import AlertRollup
+from ..services.dashboard_state import dashboard_state
+from ..services.monitoring_changes import monitoring_changes
+from ..services.tenant_versions import ALERTS, DEVICES, conditional_get, tenant_versions
 
 router = APIRouter(prefix="/alerts", tags=["alerts"])
 
+SUMMARY_CACHE_TTL_SEC = 10.0
+# tenant -> (ALERTS version it was built at, built at (monotonic), summary)
+_summary_cache: Dict[UUID, Tuple[int, float, AlertSummary]] = {}
+_summary_cache_lock = threading.Lock()
+
 
 def _serialize_alert(alert: Alert) -> AlertResponse:
     device = alert.device
@@ -36,43 +52,74 @@ def _serialize_alert(alert: Alert) -> AlertResponse:
     )
 
 
-def _build_summary(db: Session, tenant_id: UUID) -> AlertSummary:
-    counts = {status: 0 for status in AlertStatus}
-    rows = (
-        db.query(Alert.status, func.count(Alert.id))
-        .filter(Alert.tenant_id == tenant_id)
-        .group_by(Alert.status)
-        .all()
+def _alert_event(alert: Alert, kind: str, at: datetime) -> AlertEvent:
+    return AlertEvent(
+        type=kind,
+        tenant_id=alert.tenant_id,
+        alert_id=alert.id,
+        device_id=alert.device_id,
+        metric_key=alert.metric_key,
+        status=alert.status,
+        severity=alert.severity,
+        at=at,
+        value=alert.value,
+        message=alert.message,
     )
-    for status_value, total in rows:
-        counts[status_value] = total
-
-    critical_active = (
-        db.query(func.count(Alert.id))
-        .filter(
-            Alert.tenant_id == tenant_id,
-            Alert.severity == AlertSeverity.critical,
-            Alert.status.in_([AlertStatus.open, AlertStatus.acked]),
+
+
+def _build_summary(db: Session, tenant_id: UUID) -> AlertSummary:
+    counts = read_alert_counts(db, tenant_id)
+
+    def total(*statuses: AlertStatus, severity: AlertSeverity | None = None) -> int:
+        return sum(
+            count
+            for (status_value, severity_value), count in counts.items()
+            if status_value in statuses and (severity is None or severity_value == severity)
         )
-        .scalar()
-        or 0
-    )
 
     return AlertSummary(
-        open=counts[AlertStatus.open],
-        acked=counts[AlertStatus.acked],
-        resolved=counts[AlertStatus.resolved],
-        critical_active=critical_active,
+        open=total(AlertStatus.open),
+        acked=total(AlertStatus.acked),
+        resolved=total(AlertStatus.resolved),
+        critical_active=total(*ACTIVE_ALERT_STATUSES, severity=AlertSeverity.critical),
     )
 
 
-def _get_alert(alert_id: UUID, current_user: User, db: Session) -> Alert:
-    alert = (
-        db.query(Alert)
-        .options(selectinload(Alert.device))
-        .filter(Alert.id == alert_id, Alert.tenant_id == current_user.tenant_id)
-        .first()
+def _cached_summary(db: Session, tenant_id: UUID) -> AlertSummary:
+    # Reused until the tenant's alerts change in this process or the TTL lapses (archiving, other writers).
+    version = tenant_versions.get(tenant_id, ALERTS)
+    with _summary_cache_lock:
+        cached = _summary_cache.get(tenant_id)
+    if cached is not None and cached[0] == version and time.monotonic() - cached[1] < SUMMARY_CACHE_TTL_SEC:
+        return cached[2]
+    summary = _build_summary(db, tenant_id)
+    with _summary_cache_lock:
+        _summary_cache[tenant_id] = (version, time.monotonic(), summary)
+    return summary
+
+
+def _encode_cursor(alert: Alert) -> str:
+    raw = f"{alert.created_at.isoformat()}|{alert.id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, alert_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), UUID(alert_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise api_error("Invalid cursor", details={"cursor": cursor}) from exc
+
+
+def _get_alert(alert_id: UUID, current_user: User, db: Session, *, for_update: bool = False) -> Alert:
+    query = db.query(Alert).options(selectinload(Alert.device)).filter(
+        Alert.id == alert_id, Alert.tenant_id == current_user.tenant_id
     )
+    if for_update:
+        # Status transitions read the current status to adjust alert_counters; serialize them.
+        query = query.with_for_update(of=Alert)
+    alert = query.first()
     if not alert:
         raise api_error("Alert not found", status_code=status.HTTP_404_NOT_FOUND)
     return alert
@@ -80,28 +127,54 @@ def _get_alert(alert_id: UUID, current_user: User, db: Session) -> Alert:
 
 @router.get("", response_model=AlertListResponse)
 def list_alerts(
+    request: Request,
+    response: Response,
     status_filter: AlertStatus | None = Query(default=None, alias="status"),
     device_id: UUID | None = Query(default=None),
     limit: int = Query(default=100, ge=1, le=500),
-    offset: int = Query(default=0, ge=0),
+    cursor: str | None = Query(default=None),
+    offset: int = Query(default=0, ge=0, deprecated=True),
+    include_summary: bool = Query(default=True),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
+    # Items embed the device name and location, so device edits invalidate the list as well.
+    not_modified = conditional_get(request, response, current_user.tenant_id, (ALERTS, DEVICES))
+    if not_modified is not None:
+        return not_modified
+
     query = (
         db.query(Alert)
         .options(selectinload(Alert.device))
         .filter(Alert.tenant_id == current_user.tenant_id)
-        .order_by(Alert.created_at.desc())
+        .order_by(Alert.created_at.desc(), Alert.id.desc())
     )
 
     if status_filter:
         query = query.filter(Alert.status == status_filter)
     if device_id:
         query = query.filter(Alert.device_id == device_id)
+    if cursor:
+        if offset:
+            raise api_error("Use either cursor or offset, not both")
+        created_at, alert_id = _decode_cursor(cursor)
+        # The plain created_at bound lets the (.., created_at DESC) indexes seek; the row
+        # comparison breaks ties on id.
+        query = query.filter(
+            Alert.created_at <= created_at,
+            tuple_(Alert.created_at, Alert.id) < tuple_(created_at, alert_id),
+        )
+    elif offset:
+        query = query.offset(offset)
 
-    alerts = query.offset(offset).limit(limit).all()
-    summary = _build_summary(db, current_user.tenant_id)
-    return AlertListResponse(items=[_serialize_alert(alert) for alert in alerts], summary=summary)
+    alerts = query.limit(limit + 1).all()
+    next_cursor = _encode_cursor(alerts[limit - 1]) if len(alerts) > limit else None
+    summary = _cached_summary(db, current_user.tenant_id) if include_summary else None
+    return AlertListResponse(
+        items=[_serialize_alert(alert) for alert in alerts[:limit]],
+        summary=summary,
+        next_cursor=next_cursor,
+    )
 
 
 @router.post("/{alert_id}/ack", response_model=AlertResponse)
@@ -110,13 +183,21 @@ def acknowledge_alert(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    alert = _get_alert(alert_id, current_user, db)
+    alert = _get_alert(alert_id, current_user, db, for_update=True)
     if alert.status == AlertStatus.resolved:
         raise api_error("Alert already resolved", status_code=status.HTTP_400_BAD_REQUEST)
 
+    counters = AlertCounters()
+    counters.move(current_user.tenant_id, (alert.status, alert.severity), (AlertStatus.acked, alert.severity))
     alert.status = AlertStatus.acked
     alert.acked_at = datetime.now(timezone.utc)
+    alert_key = (alert.device_id, alert.metric_key)
+    event = _alert_event(alert, ACKED, alert.acked_at)
+    counters.flush(db)
     db.commit()
+    tenant_versions.bump(current_user.tenant_id, ALERTS)
+    monitoring_changes.record_alerts([alert_key])
+    alert_events.publish([event])
     db.expunge(alert)
     return _serialize_alert(_get_alert(alert_id, current_user, db))
 
@@ -127,14 +208,126 @@ def resolve_alert(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    alert = _get_alert(alert_id, current_user, db)
+    alert = _get_alert(alert_id, current_user, db, for_update=True)
     if alert.status == AlertStatus.resolved:
         return _serialize_alert(alert)
 
+    counters = AlertCounters()
+    counters.move(current_user.tenant_id, (alert.status, alert.severity), (AlertStatus.resolved, alert.severity))
     alert.status = AlertStatus.resolved
     alert.resolved_at = datetime.now(timezone.utc)
     if alert.acked_at is None:
         alert.acked_at = alert.resolved_at
+    resolved_at = alert.resolved_at
+    alert_key = (alert.device_id, alert.metric_key)
+    event = _alert_event(alert, RESOLVED, resolved_at)
+    rollup = AlertRollup()
+    rollup.resolved(current_user.tenant_id, resolved_at)
+    rollup.flush(db)
+    counters.flush(db)
     db.commit()
+    dashboard_state.record_alert_resolved(current_user.tenant_id, resolved_at)
+    tenant_versions.bump(current_user.tenant_id, ALERTS)
+    monitoring_changes.record_alerts([alert_key])
+    alert_events.publish([event])
     db.expunge(alert)
     return _serialize_alert(_get_alert(alert_id, current_user, db))
+
+
+@router.post("/bulk", response_model=AlertBulkResponse)
+def bulk_update_alerts(
+    payload: AlertBulkRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Acknowledge or resolve many alerts with one UPDATE, selected by ``ids`` or by ``filter``."""
+
+    if (payload.ids is None) == (payload.filter is None):
+        raise api_error("Provide either ids or filter")
+    tenant_id = current_user.tenant_id
+    now = datetime.now(timezone.utc)
+
+    criteria = [Alert.tenant_id == tenant_id]
+    if payload.ids is not None:
+        criteria.append(Alert.id.in_(set(payload.ids)))
+    else:
+        criteria_filter = payload.filter
+        # Explicit nulls count as unset: {"status": null} must not select the whole tenant.
+        if all(value is None for value in criteria_filter.model_dump().values()):
+            raise api_error("Filter needs at least one criterion")
+        if criteria_filter.device_id is not None:
+            criteria.append(Alert.device_id == criteria_filter.device_id)
+        if criteria_filter.metric_key is not None:
+            criteria.append(Alert.metric_key == criteria_filter.metric_key)
+        if criteria_filter.status is not None:
+            criteria.append(Alert.status == criteria_filter.status)
+        if criteria_filter.created_before is not None:
+            criteria.append(Alert.created_at < criteria_filter.created_before)
+
+    if payload.action == "ack":
+        target = AlertStatus.acked
+        criteria.append(Alert.status == AlertStatus.open)
+        changes = {"status": target, "acked_at": now}
+    else:
+        target = AlertStatus.resolved
+        criteria.append(Alert.status.in_(ACTIVE_ALERT_STATUSES))
+        changes = {"status": target, "resolved_at": now, "acked_at": func.coalesce(Alert.acked_at, now)}
+
+    # Lock the targets first and read their status from the locked rows: under READ COMMITTED
+    # the locking read sees the latest committed version, e.g. an ack that raced this request.
+    previous = (
+        select(Alert.id, Alert.status)
+        .where(*criteria)
+        .order_by(Alert.id)
+        .with_for_update()
+        .subquery("previous")
+    )
+    statement = (
+        update(Alert)
+        .where(Alert.id == previous.c.id)
+        .values(**changes)
+        .returning(
+            Alert.id,
+            Alert.device_id,
+            Alert.metric_key,
+            previous.c.status.label("previous_status"),
+            Alert.severity,
+            Alert.value,
+            Alert.message,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    rows = db.execute(statement).all()
+
+    counters = AlertCounters()
+    rollup = AlertRollup()
+    for row in rows:
+        counters.move(tenant_id, (row.previous_status, row.severity), (target, row.severity))
+        if target == AlertStatus.resolved:
+            rollup.resolved(tenant_id, now)
+    rollup.flush(db)
+    counters.flush(db)
+    db.commit()
+
+    if rows:
+        if target == AlertStatus.resolved:
+            dashboard_state.record_alert_resolved(tenant_id, now, count=len(rows))
+        tenant_versions.bump(tenant_id, ALERTS)
+        monitoring_changes.record_alerts((row.device_id, row.metric_key) for row in rows)
+        alert_events.publish(
+            AlertEvent(
+                type=ACKED if target == AlertStatus.acked else RESOLVED,
+                tenant_id=tenant_id,
+                alert_id=row.id,
+                device_id=row.device_id,
+                metric_key=row.metric_key,
+                status=target,
+                severity=row.severity,
+                at=now,
+                value=row.value,
+                message=row.message,
+            )
+            for row in rows
+        )
+    skipped = len(set(payload.ids)) - len(rows) if payload.ids is not None else 0
+    return AlertBulkResponse(action=payload.action, updated=len(rows), skipped=skipped)
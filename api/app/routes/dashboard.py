@@ -1,14 +1,19 @@
 from __future__ import annotations
 
-from datetime import datetime, timedelta, timezone
-from typing import Dict, List
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Tuple, TypeVar
+from uuid import UUID
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response, status
 from sqlalchemy import func
 from sqlalchemy.orm import Session
 
-from ..db.models import Alert, AlertStatus, Device, DeviceStatus, User
-from ..db.session import get_db
+from ..core.config import get_settings
+from ..core.errors import api_error
+from ..db.models import AlertDailyCount, Device, DeviceStatus, User
+from ..db.session import SessionLocal
 from ..routes.auth import get_current_user
 from ..schemas.dashboard import (
     DashboardAlertPoint,
@@ -17,33 +22,47 @@ from ..schemas.dashboard import (
     DashboardSummaryResponse,
     DashboardTelemetryPoint,
 )
+from ..services.alert_counters import count_active_alerts
+from ..services.dashboard_state import (
+    TREND_DAYS,
+    WARNING_WINDOW,
+    DashboardCounts,
+    DashboardSnapshot,
+    dashboard_state,
+)
+from ..services.single_flight import SingleFlight
 from ..services.telemetry_store import TelemetryStore, get_telemetry_store
+from ..services.tenant_versions import ALERTS, DEVICES, TELEMETRY, conditional_get
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+settings = get_settings()
 telemetry_store: TelemetryStore = get_telemetry_store()
+snapshot_flights = SingleFlight()
+# Dedicated pool so summary fan-out cannot exhaust the request threadpool.
+summary_executor = ThreadPoolExecutor(max_workers=settings.dashboard_query_workers, thread_name_prefix="dashboard")
+
+T = TypeVar("T")
 
-ONLINE_WINDOW_MINUTES = 5
-WARNING_WINDOW_MINUTES = 30
 TELEMETRY_WINDOW_HOURS = 1
 TELEMETRY_INTERVAL = "5m"
+TELEMETRY_CACHE_TTL = timedelta(seconds=30)
 
 
 def _count_devices(db: Session, tenant_id) -> Dict[str, int]:
+    # One pass over the tenant's rows: COUNT(*) FILTER (WHERE status = ...) per status.
+    columns = [func.count().filter(Device.status == device_status).label(device_status.value) for device_status in DeviceStatus]
+    row = db.query(*columns).filter(Device.tenant_id == tenant_id).one()
+    return {device_status.value: getattr(row, device_status.value) or 0 for device_status in DeviceStatus}
+
+
+def _load_recent_devices(db: Session, tenant_id, now: datetime) -> Dict[UUID, datetime]:
+    # Range scan on ix_devices_tenant_last_seen: only devices inside the warning window are read.
     rows = (
-        db.query(Device.status, func.count(Device.id))
-        .filter(Device.tenant_id == tenant_id)
-        .group_by(Device.status)
+        db.query(Device.id, Device.last_seen_at)
+        .filter(Device.tenant_id == tenant_id, Device.last_seen_at >= now - WARNING_WINDOW)
         .all()
     )
-    counts = {status.value: 0 for status in DeviceStatus}
-    for status, total in rows:
-        counts[status.value] = total
-    return counts
-
-
-def _count_online_devices(devices: List[Device]) -> int:
-    threshold = datetime.now(timezone.utc) - timedelta(minutes=ONLINE_WINDOW_MINUTES)
-    return sum(1 for device in devices if device.last_seen_at and device.last_seen_at >= threshold)
+    return {row.id: row.last_seen_at for row in rows}
 
 
 def _build_status_slices(counts: Dict[str, int]) -> List[DashboardStatusSlice]:
@@ -56,73 +75,88 @@ def _build_status_slices(counts: Dict[str, int]) -> List[DashboardStatusSlice]:
     return [DashboardStatusSlice(label=labels[key], value=counts.get(key, 0)) for key in order]
 
 
-def _build_fleet_health(devices: List[Device]) -> DashboardFleetHealth:
-    now = datetime.now(timezone.utc)
-    healthy_cutoff = now - timedelta(minutes=ONLINE_WINDOW_MINUTES)
-    warning_cutoff = now - timedelta(minutes=WARNING_WINDOW_MINUTES)
-    healthy = 0
-    warning = 0
-    critical = 0
-
-    for device in devices:
-        last_seen = device.last_seen_at
-        if last_seen and last_seen >= healthy_cutoff:
-            healthy += 1
-        elif last_seen and last_seen >= warning_cutoff:
-            warning += 1
-        else:
-            critical += 1
-    return DashboardFleetHealth(healthy=healthy, warning=warning, critical=critical)
+def _trend_start(now: datetime) -> datetime:
+    return (now - timedelta(days=TREND_DAYS - 1)).replace(hour=0, minute=0, second=0, microsecond=0)
 
 
-def _build_alerts_trend(db: Session, tenant_id) -> List[DashboardAlertPoint]:
-    now = datetime.now(timezone.utc)
-    start_day = (now - timedelta(days=6)).replace(hour=0, minute=0, second=0, microsecond=0)
+def _load_alert_days(db: Session, tenant_id, now: datetime) -> Tuple[Dict[date, int], Dict[date, int]]:
+    # At most TREND_DAYS rows from the alert_daily_counts rollup instead of scanning alert history.
     rows = (
-        db.query(func.date_trunc("day", Alert.created_at).label("day"), func.count(Alert.id))
-        .filter(Alert.tenant_id == tenant_id, Alert.created_at >= start_day)
-        .group_by("day")
-        .order_by("day")
+        db.query(AlertDailyCount.day, AlertDailyCount.opened, AlertDailyCount.resolved)
+        .filter(AlertDailyCount.tenant_id == tenant_id, AlertDailyCount.day >= _trend_start(now).date())
         .all()
     )
-    counts = {row.day.date(): row[1] for row in rows}
+    return {row.day: row.opened for row in rows}, {row.day: row.resolved for row in rows}
+
+
+def _build_alerts_trend(opened_by_day: Dict[date, int], now: datetime) -> List[DashboardAlertPoint]:
+    start_day = _trend_start(now)
     points: List[DashboardAlertPoint] = []
-    for index in range(7):
+    for index in range(TREND_DAYS):
         day = start_day + timedelta(days=index)
         label = day.strftime("%a")
-        count = counts.get(day.date(), 0)
+        count = opened_by_day.get(day.date(), 0)
         points.append(DashboardAlertPoint(label=label, count=count))
     return points
 
 
-def _count_active_alerts(db: Session, tenant_id) -> int:
-    return (
-        db.query(func.count(Alert.id))
-        .filter(Alert.tenant_id == tenant_id, Alert.status.in_([AlertStatus.open, AlertStatus.acked]))
-        .scalar()
-        or 0
-    )
+def _run_in_session(query: Callable[[Session], T]) -> T:
+    db = SessionLocal()
+    try:
+        return query(db)
+    finally:
+        db.close()
+
+
+async def _run_part(name: str, query: Callable[[Session], T]) -> T:
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(summary_executor, _run_in_session, query)
+    try:
+        return await asyncio.wait_for(future, timeout=settings.dashboard_part_timeout_sec)
+    except asyncio.TimeoutError as exc:
+        raise api_error(
+            "Dashboard summary unavailable",
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            details={"part": name},
+        ) from exc
+
+
+async def load_dashboard_snapshot(tenant_id) -> DashboardSnapshot:
+    """Load the authoritative figures, running the independent queries concurrently.
 
+    Each part uses its own session on ``summary_executor`` and is bounded by
+    ``dashboard_part_timeout_sec``. Also used by the reconciliation task started in ``main``.
+    """
 
-def _count_resolved_today(db: Session, tenant_id) -> int:
     now = datetime.now(timezone.utc)
-    start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    return (
-        db.query(func.count(Alert.id))
-        .filter(Alert.tenant_id == tenant_id, Alert.resolved_at.isnot(None), Alert.resolved_at >= start_of_day)
-        .scalar()
-        or 0
+    status_counts, recent_seen, active_alerts, (opened_by_day, resolved_by_day) = await asyncio.gather(
+        _run_part("device_status", lambda db: _count_devices(db, tenant_id)),
+        _run_part("fleet_health", lambda db: _load_recent_devices(db, tenant_id, now)),
+        _run_part("active_alerts", lambda db: count_active_alerts(db, tenant_id)),
+        _run_part("alerts_trend", lambda db: _load_alert_days(db, tenant_id, now)),
+    )
+    return DashboardSnapshot(
+        status_counts=status_counts,
+        recent_seen=recent_seen,
+        active_alerts=active_alerts,
+        opened_by_day=opened_by_day,
+        resolved_by_day=resolved_by_day,
     )
 
 
-def _build_telemetry_series(tenant_id) -> List[DashboardTelemetryPoint]:
-    now = datetime.now(timezone.utc)
+async def _build_telemetry_series(tenant_id) -> List[DashboardTelemetryPoint] | None:
+    now = datetime.now(timezone.utc).replace(microsecond=0)
     start = now - timedelta(hours=TELEMETRY_WINDOW_HOURS)
     try:
-        power_points = telemetry_store.fetch_metric_series(tenant_id, "power_w", start, now, TELEMETRY_INTERVAL)
-        current_points = telemetry_store.fetch_metric_series(tenant_id, "current_a", start, now, TELEMETRY_INTERVAL)
-    except RuntimeError:
-        return []
+        power_points, current_points = await asyncio.wait_for(
+            asyncio.gather(
+                telemetry_store.fetch_metric_series_async(tenant_id, "power_w", start, now, TELEMETRY_INTERVAL),
+                telemetry_store.fetch_metric_series_async(tenant_id, "current_a", start, now, TELEMETRY_INTERVAL),
+            ),
+            timeout=settings.dashboard_part_timeout_sec,
+        )
+    except (RuntimeError, asyncio.TimeoutError):
+        return None
 
     combined: Dict[datetime, DashboardTelemetryPoint] = {}
     for point in power_points:
@@ -136,33 +170,54 @@ def _build_telemetry_series(tenant_id) -> List[DashboardTelemetryPoint]:
     return sorted(combined.values(), key=lambda item: item.timestamp)
 
 
+async def read_dashboard_counts(tenant_id) -> DashboardCounts:
+    counts = dashboard_state.read(tenant_id)
+    if counts is not None:
+        return counts
+
+    async def load() -> DashboardCounts:
+        dashboard_state.install(tenant_id, await load_dashboard_snapshot(tenant_id))
+        return dashboard_state.read(tenant_id)
+
+    return await snapshot_flights.do_async(tenant_id, load)
+
+
+async def _read_telemetry_series(tenant_id) -> List[DashboardTelemetryPoint]:
+    series = dashboard_state.cached_series(tenant_id, TELEMETRY_CACHE_TTL)
+    if series is not None:
+        return series
+    series = await _build_telemetry_series(tenant_id)
+    if series is None:
+        # Influx failed or timed out: degrade the chart only, and retry on the next request.
+        return []
+    dashboard_state.store_series(tenant_id, series)
+    return series
+
+
+def summary_fields(counts: DashboardCounts, now: datetime) -> Dict[str, Any]:
+    """Every ``DashboardSummaryResponse`` field except the telemetry series."""
+
+    return {
+        "total_devices": counts.total_devices,
+        "online_devices": counts.healthy,
+        "offline_devices": max(counts.total_devices - counts.healthy, 0),
+        "active_alerts": counts.active_alerts,
+        "resolved_today": counts.resolved_today,
+        "alerts_trend": _build_alerts_trend(counts.opened_by_day, now),
+        "device_status_split": _build_status_slices(counts.status_counts),
+        "fleet_health": DashboardFleetHealth(healthy=counts.healthy, warning=counts.warning, critical=counts.critical),
+    }
+
+
 @router.get("/summary", response_model=DashboardSummaryResponse)
-def dashboard_summary(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-):
+async def dashboard_summary(request: Request, response: Response, current_user: User = Depends(get_current_user)):
     tenant_id = current_user.tenant_id
-    devices = (
-        db.query(Device)
-        .filter(Device.tenant_id == tenant_id)
-        .all()
-    )
-    total_devices = len(devices)
-    status_counts = _count_devices(db, tenant_id)
-    online_devices = _count_online_devices(devices)
-    active_alerts = _count_active_alerts(db, tenant_id)
-    resolved_today = _count_resolved_today(db, tenant_id)
-    alerts_trend = _build_alerts_trend(db, tenant_id)
-    telemetry_series = _build_telemetry_series(tenant_id)
-
-    return DashboardSummaryResponse(
-        total_devices=total_devices,
-        online_devices=online_devices,
-        offline_devices=max(total_devices - online_devices, 0),
-        active_alerts=active_alerts,
-        resolved_today=resolved_today,
-        alerts_trend=alerts_trend,
-        telemetry_series=telemetry_series,
-        device_status_split=_build_status_slices(status_counts),
-        fleet_health=_build_fleet_health(devices),
-    )
+    # Fleet health ages with wall-clock time even without events, so the tag also rolls over each minute.
+    minute = int(datetime.now(timezone.utc).timestamp() // 60)
+    not_modified = conditional_get(request, response, tenant_id, (DEVICES, ALERTS, TELEMETRY), minute)
+    if not_modified is not None:
+        return not_modified
+
+    counts, telemetry_series = await asyncio.gather(read_dashboard_counts(tenant_id), _read_telemetry_series(tenant_id))
+
+    return DashboardSummaryResponse(**summary_fields(counts, datetime.now(timezone.utc)), telemetry_series=telemetry_series)
@@ -5,24 +5,34 @@ import secrets
 from datetime import datetime, timedelta, timezone
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, Query, status
+from fastapi import APIRouter, Depends, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from ..core.config import get_settings
 from ..core.errors import api_error
-from ..core.telemetry import metric_keys
-from ..db.models import Device, DeviceStatus, DeviceThreshold, User
+from ..core.telemetry import METRIC_DEFINITIONS, metric_keys
+from ..db.models import Device, DeviceStatus, DeviceThreshold, ThresholdAggregate, User
 from ..db.session import get_db
 from ..routes.auth import get_current_user
 from ..schemas.device import DeviceCreateRequest, DeviceListResponse, DeviceResponse, DeviceUpdateRequest
-from ..schemas.telemetry import TelemetryLastResponse, TelemetryRangeResponse
+from ..schemas.telemetry import (
+    TelemetryLastBatchItem,
+    TelemetryLastBatchResponse,
+    TelemetryLastResponse,
+    TelemetryRangeResponse,
+)
 from ..schemas.threshold import (
     ThresholdBulkUpdateRequest,
     ThresholdListResponse,
     ThresholdResponse,
 )
+from ..services.dashboard_state import dashboard_state
+from ..services.downsampling import lttb
+from ..services.monitoring_changes import monitoring_changes
 from ..services.telemetry_hub import TelemetrySample, telemetry_hub
 from ..services.telemetry_store import TelemetryStore, get_telemetry_store
+from ..services.tenant_versions import DEVICES, conditional_get, tenant_versions
 
 router = APIRouter(prefix="/devices", tags=["devices"])
 settings = get_settings()
@@ -31,6 +41,8 @@ telemetry_store: TelemetryStore = get_telemetry_store()
 INTERVAL_PATTERN = re.compile(r"^(\d+)(s|m|h|d)$")
 DEFAULT_RANGE_HOURS = 1
 MAX_RANGE_DAYS = 7
+MAX_CHART_POINTS = 10000
+MAX_BATCH_DEVICES = 1000
 
 
 def _generate_device_key() -> str:
@@ -53,8 +65,12 @@ def _build_telemetry_topic(device: Device) -> str:
     return f"{base.rstrip('/')}/telemetry"
 
 
+def _status_value(value: DeviceStatus | str) -> str:
+    return value.value if hasattr(value, "value") else value
+
+
 def _serialize_device(device: Device) -> DeviceResponse:
-    status_value = device.status.value if hasattr(device.status, "value") else device.status
+    status_value = _status_value(device.status)
     return DeviceResponse(
         id=device.id,
         tenant_id=device.tenant_id,
@@ -90,6 +106,8 @@ def _serialize_threshold(threshold: DeviceThreshold) -> ThresholdResponse:
         max_value=threshold.max_value,
         hysteresis=threshold.hysteresis,
         enabled=threshold.enabled,
+        aggregate=threshold.aggregate,
+        window_sec=threshold.window_sec,
         created_at=threshold.created_at,
         updated_at=threshold.updated_at,
     )
@@ -141,8 +159,54 @@ def _validate_interval(value: str | None) -> str:
     return candidate
 
 
+def _parse_device_ids(raw: str) -> list[UUID]:
+    device_ids: list[UUID] = []
+    for chunk in raw.split(","):
+        candidate = chunk.strip()
+        if not candidate:
+            continue
+        try:
+            device_ids.append(UUID(candidate))
+        except ValueError as exc:
+            raise api_error("Invalid device id", details={"id": candidate}) from exc
+    unique_ids = list(dict.fromkeys(device_ids))
+    if len(unique_ids) > MAX_BATCH_DEVICES:
+        raise api_error("Too many device ids", details={"limit": MAX_BATCH_DEVICES})
+    return unique_ids
+
+
+def _list_tenant_device_ids(db: Session, tenant_id: UUID, device_ids: list[UUID] | None) -> list[UUID]:
+    query = db.query(Device.id).filter(Device.tenant_id == tenant_id)
+    if device_ids is None:
+        return [row.id for row in query.order_by(Device.created_at.desc()).all()]
+    owned = {row.id for row in query.filter(Device.id.in_(device_ids)).all()}
+    return [device_id for device_id in device_ids if device_id in owned]
+
+
+def _cache_last_sample(sample: TelemetryLastResponse) -> None:
+    telemetry_hub.update(
+        TelemetrySample(
+            device_id=sample.device_id,
+            timestamp=sample.timestamp,
+            metrics={key: metric.value for key, metric in sample.metrics.items()},
+        )
+    )
+
+
 @router.get("", response_model=DeviceListResponse)
-def list_devices(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def list_devices(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    # last_seen_at moves with every ingest, so instead of TELEMETRY (bumped per sample, which
+    # would defeat the 304s) the tag rolls over each minute: last_seen_at is at most a minute stale.
+    minute = int(datetime.now(timezone.utc).timestamp() // 60)
+    not_modified = conditional_get(request, response, current_user.tenant_id, (DEVICES,), minute)
+    if not_modified is not None:
+        return not_modified
+
     devices = (
         db.query(Device)
         .filter(Device.tenant_id == current_user.tenant_id)
@@ -152,6 +216,44 @@ def list_devices(db: Session = Depends(get_db), current_user: User = Depends(get
     return DeviceListResponse(items=[_serialize_device(device) for device in devices])
 
 
+@router.get("/telemetry/last", response_model=TelemetryLastBatchResponse)
+async def telemetry_last_batch(
+    ids: str | None = Query(None, description="Comma separated device ids; omit for every device of the tenant"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    requested = _parse_device_ids(ids) if ids is not None else None
+    device_ids = await run_in_threadpool(_list_tenant_device_ids, db, current_user.tenant_id, requested)
+
+    latest = telemetry_hub.get_last_many(device_ids)
+    misses = [device_id for device_id in device_ids if device_id not in latest]
+    if misses:
+        # A tenant-wide request that is cold, or misses more than an explicit id list may hold,
+        # filters by tenant only instead of shipping the ids to Flux as one contains() set.
+        tenant_wide = requested is None and (len(misses) == len(device_ids) or len(misses) > MAX_BATCH_DEVICES)
+        try:
+            fetched = await telemetry_store.fetch_last_many_async(current_user.tenant_id, None if tenant_wide else misses)
+        except RuntimeError as exc:
+            raise api_error("Telemetry store unavailable", status_code=status.HTTP_502_BAD_GATEWAY) from exc
+        for device_id in misses:
+            sample = fetched.get(device_id)
+            if sample:
+                _cache_last_sample(sample)
+                latest[device_id] = sample
+
+    items: list[TelemetryLastBatchItem] = []
+    for device_id in device_ids:
+        sample = latest.get(device_id)
+        if sample is None:
+            items.append(TelemetryLastBatchItem(device_id=device_id, timestamp=None, values={}))
+            continue
+        values = {key: metric.value for key, metric in sample.metrics.items()}
+        items.append(TelemetryLastBatchItem(device_id=device_id, timestamp=sample.timestamp, values=values))
+
+    units = {definition.key.value: definition.unit for definition in METRIC_DEFINITIONS.values()}
+    return TelemetryLastBatchResponse(units=units, items=items)
+
+
 @router.post("", response_model=DeviceResponse, status_code=status.HTTP_201_CREATED)
 def create_device(
     payload: DeviceCreateRequest,
@@ -177,6 +279,9 @@ def create_device(
 
     db.commit()
     db.refresh(device)
+    dashboard_state.record_device_added(device.tenant_id, _status_value(device.status))
+    tenant_versions.bump(device.tenant_id, DEVICES)
+    monitoring_changes.record_devices([device.id])
     return _serialize_device(device)
 
 
@@ -194,6 +299,7 @@ def update_device(
     current_user: User = Depends(get_current_user),
 ):
     device = _get_device(db, current_user.tenant_id, device_id)
+    previous_status = _status_value(device.status)
 
     if payload.name is not None:
         device.name = payload.name
@@ -210,6 +316,9 @@ def update_device(
 
     db.commit()
     db.refresh(device)
+    dashboard_state.record_device_status(device.tenant_id, previous_status, _status_value(device.status))
+    tenant_versions.bump(device.tenant_id, DEVICES)
+    monitoring_changes.record_devices([device.id])
     return _serialize_device(device)
 
 
@@ -243,6 +352,12 @@ def upsert_thresholds(
                 details={"metric_key": item.metric_key},
                 status_code=status.HTTP_400_BAD_REQUEST,
             )
+        if (item.aggregate == ThresholdAggregate.last) != (item.window_sec is None):
+            raise api_error(
+                "window_sec is required for mean/min/max rules and not allowed for last",
+                details={"metric_key": item.metric_key, "aggregate": item.aggregate.value},
+                status_code=status.HTTP_400_BAD_REQUEST,
+            )
         threshold = thresholds.get(item.metric_key)
         if not threshold:
             threshold = DeviceThreshold(device_id=device.id, metric_key=item.metric_key)
@@ -252,56 +367,60 @@ def upsert_thresholds(
         threshold.max_value = item.max_value
         threshold.hysteresis = item.hysteresis
         threshold.enabled = item.enabled
+        threshold.aggregate = item.aggregate
+        threshold.window_sec = item.window_sec
 
     db.commit()
+    monitoring_changes.record_devices([device_id])
     refreshed = sorted(thresholds.values(), key=lambda t: t.metric_key)
     return ThresholdListResponse(items=[_serialize_threshold(item) for item in refreshed])
 
 
 @router.get("/{device_id}/telemetry/last", response_model=TelemetryLastResponse)
-def telemetry_last(
+async def telemetry_last(
     device_id: UUID,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    device = _get_device(db, current_user.tenant_id, device_id)
+    device = await run_in_threadpool(_get_device, db, current_user.tenant_id, device_id)
     cached = telemetry_hub.get_last(device.id)
     if cached:
         return cached
 
     try:
-        last_sample = telemetry_store.fetch_last(current_user.tenant_id, device.id)
+        last_sample = await telemetry_store.fetch_last_async(current_user.tenant_id, device.id)
     except RuntimeError as exc:  # noqa: BLE001
         raise api_error("Telemetry store unavailable", status_code=status.HTTP_502_BAD_GATEWAY) from exc
 
     if last_sample:
-        telemetry_hub.update(
-            TelemetrySample(
-                device_id=device.id,
-                timestamp=last_sample.timestamp,
-                metrics={key: metric.value for key, metric in last_sample.metrics.items()},
-            )
-        )
+        _cache_last_sample(last_sample)
         return last_sample
     return telemetry_store.build_empty_last(device.id)
 
 
 @router.get("/{device_id}/telemetry/range", response_model=TelemetryRangeResponse)
-def telemetry_range(
+async def telemetry_range(
     device_id: UUID,
     metric: str = Query(..., description="Metric key"),
     from_ts: str | None = Query(None, alias="from"),
     to_ts: str | None = Query(None, alias="to"),
     interval: str | None = Query(None, description="Flux duration such as 1m,5m,1h"),
+    max_points: int | None = Query(
+        None,
+        ge=3,
+        le=MAX_CHART_POINTS,
+        description="Downsample the series to at most this many points (LTTB)",
+    ),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    device = _get_device(db, current_user.tenant_id, device_id)
+    device = await run_in_threadpool(_get_device, db, current_user.tenant_id, device_id)
     metric_key = metric.strip()
     if not _metric_key_allowed(metric_key):
         raise api_error("Unknown metric key", details={"metric": metric})
 
-    now = datetime.now(timezone.utc)
+    # Whole seconds keep concurrent default-range requests on the same coalescing key.
+    now = datetime.now(timezone.utc).replace(microsecond=0)
     start_default = now - timedelta(hours=DEFAULT_RANGE_HOURS)
     start = _parse_datetime_param(from_ts, default=start_default)
     stop = _parse_datetime_param(to_ts, default=now)
@@ -313,6 +432,12 @@ def telemetry_range(
     interval_value = _validate_interval(interval)
 
     try:
-        return telemetry_store.fetch_range(current_user.tenant_id, device.id, metric_key, start, stop, interval_value)
+        result = await telemetry_store.fetch_range_async(
+            current_user.tenant_id, device.id, metric_key, start, stop, interval_value
+        )
     except RuntimeError as exc:  # noqa: BLE001
         raise api_error("Telemetry store unavailable", status_code=status.HTTP_502_BAD_GATEWAY) from exc
+
+    if max_points is not None and len(result.points) > max_points:
+        result = result.model_copy(update={"points": lttb(result.points, max_points)})
+    return result
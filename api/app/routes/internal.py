@@ -1,23 +1,40 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Tuple
+from uuid import UUID, uuid4
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Query, status
+from sqlalchemy import Float, String, cast, column, func, select, tuple_, update, values
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID, insert
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session, selectinload
 
 from ..core.errors import api_error
-from ..db.models import Alert, AlertStatus, Device
+from ..db.models import ACTIVE_ALERT_STATUSES, Alert, AlertSeverity, AlertStatus, Device
 from ..db.session import get_db
 from ..schemas.internal import (
     InternalActiveAlert,
+    InternalAlertEvaluationItem,
     InternalAlertEvaluationRequest,
     InternalAlertEvaluationResponse,
     InternalDeviceSnapshot,
     InternalMonitoringSnapshotResponse,
+    InternalQueryProfileEntry,
+    InternalQueryProfileResponse,
+    InternalTelemetryQueryStats,
     InternalThresholdItem,
 )
 from ..schemas.telemetry import InternalTelemetryIngestRequest, TelemetryIngestResponse
+from ..services.alert_counters import AlertCounters
+from ..services.alert_events import CREATED, RESOLVED, UPDATED, AlertEvent, alert_events
+from ..services.alert_rollup import AlertRollup
+from ..services.dashboard_state import dashboard_state
+from ..services.monitoring_changes import monitoring_changes
+from ..services.sharding import device_shard
 from ..services.telemetry_hub import TelemetrySample, telemetry_hub
+from ..services.telemetry_store import get_telemetry_store
+from ..services.tenant_versions import ALERTS, TELEMETRY, tenant_versions
 
 router = APIRouter(prefix="/internal", tags=["internal"])
 
@@ -41,18 +58,30 @@ def telemetry_ingest(payload: InternalTelemetryIngestRequest, db: Session = Depe
     db.commit()
     db.refresh(device)
 
-    telemetry_hub.update(TelemetrySample(device_id=device.id, timestamp=timestamp, metrics=payload.metrics.as_dict()))
+    metrics = payload.metrics.as_dict()
+    telemetry_hub.update(TelemetrySample(device_id=device.id, timestamp=timestamp, metrics=metrics))
+    dashboard_state.record_telemetry(device.tenant_id, timestamp, metrics)
+    dashboard_state.record_device_seen(device.tenant_id, device.id, timestamp)
+    tenant_versions.bump(device.tenant_id, TELEMETRY)
 
     return TelemetryIngestResponse(device_id=device.id, tenant_id=device.tenant_id)
 
 
-@router.get("/monitoring/snapshot", response_model=InternalMonitoringSnapshotResponse, include_in_schema=False)
-def monitoring_snapshot(db: Session = Depends(get_db)):
-    devices = (
-        db.query(Device)
-        .options(selectinload(Device.thresholds))
-        .all()
-    )
+@router.get("/telemetry/query_stats", response_model=InternalTelemetryQueryStats, include_in_schema=False)
+def telemetry_query_stats():
+    return InternalTelemetryQueryStats(**get_telemetry_store().query_stats())
+
+
+@router.get("/telemetry/query_profile", response_model=InternalQueryProfileResponse, include_in_schema=False)
+def telemetry_query_profile(reset: bool = False):
+    profiler = get_telemetry_store().profiler
+    items = [InternalQueryProfileEntry(**entry) for entry in profiler.snapshot()]
+    if reset:
+        profiler.reset()
+    return InternalQueryProfileResponse(slow_query_ms=profiler.slow_query_ms, items=items)
+
+
+def _device_snapshots(devices: List[Device]) -> List[InternalDeviceSnapshot]:
     device_payloads: list[InternalDeviceSnapshot] = []
     for device in devices:
         thresholds = [
@@ -62,6 +91,8 @@ def monitoring_snapshot(db: Session = Depends(get_db)):
                 max_value=threshold.max_value,
                 hysteresis=threshold.hysteresis,
                 enabled=threshold.enabled,
+                aggregate=threshold.aggregate,
+                window_sec=threshold.window_sec,
             )
             for threshold in device.thresholds
         ]
@@ -75,18 +106,293 @@ def monitoring_snapshot(db: Session = Depends(get_db)):
                 thresholds=thresholds,
             )
         )
+    return device_payloads
+
+
+@router.get("/monitoring/snapshot", response_model=InternalMonitoringSnapshotResponse, include_in_schema=False)
+def monitoring_snapshot(
+    since: str | None = None,
+    shard_index: int = Query(default=0, ge=0),
+    shard_count: int = Query(default=1, ge=1),
+    db: Session = Depends(get_db),
+):
+    """Devices and active alerts for one worker shard (all of them with the default 0/1).
+
+    A device belongs to ``device_shard(device_id, shard_count) == shard_index``; jump hashing
+    keeps most devices on their shard when ``shard_count`` changes.
+    """
+
+    if shard_index >= shard_count:
+        raise api_error("shard_index must be below shard_count", details={"shard_index": shard_index, "shard_count": shard_count})
+
+    def in_shard(device_id: UUID) -> bool:
+        return device_shard(device_id, shard_count) == shard_index
+
+    changes = monitoring_changes.since(since)
+    if changes is None:
+        # Taken before querying: anything committed later carries a newer version.
+        version = monitoring_changes.current()
+        device_query = db.query(Device).options(selectinload(Device.thresholds))
+        alert_query = db.query(Alert.device_id, Alert.metric_key, Alert.status).filter(
+            Alert.status.in_(ACTIVE_ALERT_STATUSES)
+        )
+        if shard_count > 1:
+            # The SQL port of device_shard (migration 20261019_07) keeps ownership in the database.
+            owned = select(Device.id).where(func.device_shard(Device.id, shard_count) == shard_index)
+            device_query = device_query.filter(Device.id.in_(owned))
+            alert_query = alert_query.filter(Alert.device_id.in_(owned))
+        devices = device_query.all()
+        alert_payloads = [
+            InternalActiveAlert(device_id=item.device_id, metric_key=item.metric_key, status=item.status)
+            for item in alert_query
+        ]
+        return InternalMonitoringSnapshotResponse(
+            version=version,
+            devices=_device_snapshots(devices),
+            active_alerts=alert_payloads,
+        )
 
-    active_alerts = (
-        db.query(Alert)
-        .filter(Alert.status.in_([AlertStatus.open, AlertStatus.acked]))
-        .with_entities(Alert.device_id, Alert.metric_key, Alert.status)
-        .all()
+    changes = changes._replace(
+        devices={device_id for device_id in changes.devices if in_shard(device_id)},
+        alerts={key for key in changes.alerts if in_shard(key[0])},
     )
+    device_payloads: list[InternalDeviceSnapshot] = []
+    if changes.devices:
+        devices = (
+            db.query(Device)
+            .options(selectinload(Device.thresholds))
+            .filter(Device.id.in_(changes.devices))
+            .all()
+        )
+        device_payloads = _device_snapshots(devices)
+    removed = changes.devices - {payload.device_id for payload in device_payloads}
+
+    active: Dict[Tuple[UUID, str], AlertStatus] = {}
+    if changes.alerts:
+        rows = (
+            db.query(Alert.device_id, Alert.metric_key, Alert.status)
+            .filter(
+                tuple_(Alert.device_id, Alert.metric_key).in_(list(changes.alerts)),
+                Alert.status.in_(ACTIVE_ALERT_STATUSES),
+            )
+            .all()
+        )
+        active = {(row.device_id, row.metric_key): row.status for row in rows}
     alert_payloads = [
-        InternalActiveAlert(device_id=item.device_id, metric_key=item.metric_key, status=item.status)
-        for item in active_alerts
+        InternalActiveAlert(device_id=device_id, metric_key=metric_key, status=active.get((device_id, metric_key), AlertStatus.resolved))
+        for device_id, metric_key in changes.alerts
+    ]
+    return InternalMonitoringSnapshotResponse(
+        version=changes.version,
+        full=False,
+        devices=device_payloads,
+        removed_devices=sorted(removed, key=str),
+        active_alerts=alert_payloads,
+    )
+
+
+class _AlertChange(NamedTuple):
+    tenant_id: UUID
+    alert_id: UUID
+    device_id: UUID
+    metric_key: str
+    previous: Tuple[AlertStatus, AlertSeverity] | None  # None when the statement opened the alert
+    current: Tuple[AlertStatus, AlertSeverity]
+    value: float | None
+    message: str
+    value_changed: bool
+
+
+def _latest_per_pair(items: List[InternalAlertEvaluationItem]) -> List[InternalAlertEvaluationItem]:
+    # One row per (device, metric) so a statement never touches the same alert twice; last one wins.
+    latest: Dict[Tuple[UUID, str], InternalAlertEvaluationItem] = {}
+    for item in items:
+        latest[(item.device_id, item.metric_key)] = item
+    return list(latest.values())
+
+
+def _lock_active_alerts(db: Session, keys: List[Tuple[UUID, str]]) -> Dict[Tuple[UUID, str], Row]:
+    rows = db.execute(
+        select(Alert.id, Alert.device_id, Alert.metric_key, Alert.status, Alert.severity, Alert.value)
+        .where(tuple_(Alert.device_id, Alert.metric_key).in_(keys), Alert.status.in_(ACTIVE_ALERT_STATUSES))
+        .order_by(Alert.id)
+        .with_for_update()
+    )
+    return {(row.device_id, row.metric_key): row for row in rows}
+
+
+def _upsert_breached(db: Session, items: List[InternalAlertEvaluationItem], now: datetime) -> List[_AlertChange]:
+    """Open or refresh alerts in one INSERT .. ON CONFLICT per pass.
+
+    The active alerts of the batch are locked up front and diffed in Python, so counters move from
+    the row version actually updated. The conflict update is limited to those locked rows; a pair
+    whose active alert another transaction opened after the lock is left out and retried.
+    """
+
+    changes: List[_AlertChange] = []
+    pending = items
+    while pending:
+        locked = _lock_active_alerts(db, [(item.device_id, item.metric_key) for item in pending])
+        statement = insert(Alert).values(
+            [
+                {
+                    "id": uuid4(),
+                    "tenant_id": item.tenant_id,
+                    "device_id": item.device_id,
+                    "metric_key": item.metric_key,
+                    "message": item.message,
+                    "value": item.value,
+                    "threshold_min": item.threshold_min,
+                    "threshold_max": item.threshold_max,
+                    "severity": item.severity,
+                    "status": AlertStatus.open,
+                    "created_at": now,
+                }
+                for item in pending
+            ]
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[Alert.device_id, Alert.metric_key],
+            index_where=Alert.status.in_(ACTIVE_ALERT_STATUSES),
+            set_={
+                "value": statement.excluded.value,
+                "threshold_min": statement.excluded.threshold_min,
+                "threshold_max": statement.excluded.threshold_max,
+                "message": statement.excluded.message,
+                "severity": statement.excluded.severity,
+            },
+            where=Alert.id.in_([row.id for row in locked.values()]),
+        ).returning(
+            Alert.tenant_id,
+            Alert.id,
+            Alert.device_id,
+            Alert.metric_key,
+            Alert.status,
+            Alert.severity,
+            Alert.value,
+            Alert.message,
+        )
+        done = set()
+        for row in db.execute(statement):
+            key = (row.device_id, row.metric_key)
+            done.add(key)
+            previous = locked.get(key)
+            changes.append(
+                _AlertChange(
+                    tenant_id=row.tenant_id,
+                    alert_id=row.id,
+                    device_id=row.device_id,
+                    metric_key=row.metric_key,
+                    previous=(previous.status, previous.severity) if previous else None,
+                    current=(row.status, row.severity),
+                    value=row.value,
+                    message=row.message,
+                    value_changed=previous is None or previous.value != row.value,
+                )
+            )
+        pending = [item for item in pending if (item.device_id, item.metric_key) not in done]
+    return changes
+
+
+def _resolve_recovered(db: Session, items: List[InternalAlertEvaluationItem], now: datetime) -> List[_AlertChange]:
+    """Resolve the active alerts of recovered pairs in one UPDATE .. FROM (VALUES ...).
+
+    The targets are locked in a subquery and their status is read from it, i.e. from the row
+    version this statement updates.
+    """
+
+    if not items:
+        return []
+    batch = values(
+        column("device_id", PG_UUID(as_uuid=True)),
+        column("metric_key", String),
+        column("value", Float),
+        column("threshold_min", Float),
+        column("threshold_max", Float),
+        column("message", String),
+        name="batch",
+    ).data([(item.device_id, item.metric_key, item.value, item.threshold_min, item.threshold_max, item.message) for item in items])
+    previous = (
+        select(
+            Alert.id,
+            Alert.status,
+            batch.c.value,
+            batch.c.threshold_min,
+            batch.c.threshold_max,
+            batch.c.message,
+        )
+        .where(
+            Alert.device_id == batch.c.device_id,
+            Alert.metric_key == batch.c.metric_key,
+            Alert.status.in_(ACTIVE_ALERT_STATUSES),
+        )
+        .order_by(Alert.id)
+        .with_for_update(of=Alert)
+        .subquery("previous")
+    )
+    statement = (
+        update(Alert)
+        .where(Alert.id == previous.c.id)
+        .values(
+            status=AlertStatus.resolved,
+            resolved_at=now,
+            # Untyped NULLs in VALUES default to text, so pin the numeric columns.
+            value=cast(previous.c.value, Float),
+            threshold_min=cast(previous.c.threshold_min, Float),
+            threshold_max=cast(previous.c.threshold_max, Float),
+            message=previous.c.message,
+        )
+        .returning(
+            Alert.tenant_id,
+            Alert.id,
+            Alert.device_id,
+            Alert.metric_key,
+            previous.c.status,
+            Alert.severity,
+            Alert.value,
+            Alert.message,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return [
+        _AlertChange(
+            tenant_id=tenant_id,
+            alert_id=alert_id,
+            device_id=device_id,
+            metric_key=metric_key,
+            previous=(previous_status, severity),
+            current=(AlertStatus.resolved, severity),
+            value=value,
+            message=message,
+            value_changed=True,
+        )
+        for tenant_id, alert_id, device_id, metric_key, previous_status, severity, value, message in db.execute(statement)
     ]
-    return InternalMonitoringSnapshotResponse(devices=device_payloads, active_alerts=alert_payloads)
+
+
+def _alert_event(change: _AlertChange, now: datetime) -> AlertEvent | None:
+    if change.previous is None:
+        kind = CREATED
+    elif change.current[0] == AlertStatus.resolved:
+        kind = RESOLVED
+    elif change.previous != change.current or change.value_changed:
+        kind = UPDATED
+    else:
+        # The worker re-posts every breached pair each cycle; unchanged refreshes are not events.
+        return None
+    status_value, severity = change.current
+    return AlertEvent(
+        type=kind,
+        tenant_id=change.tenant_id,
+        alert_id=change.alert_id,
+        device_id=change.device_id,
+        metric_key=change.metric_key,
+        status=status_value,
+        severity=severity,
+        at=now,
+        value=change.value,
+        message=change.message,
+    )
 
 
 @router.post("/alerts/evaluations", response_model=InternalAlertEvaluationResponse, include_in_schema=False)
@@ -94,54 +400,40 @@ def ingest_alert_evaluations(
     payload: InternalAlertEvaluationRequest,
     db: Session = Depends(get_db),
 ):
-    created = 0
-    updated = 0
-    resolved = 0
     now = datetime.now(timezone.utc)
+    items = _latest_per_pair(payload.items)
+    upserted = _upsert_breached(db, [item for item in items if item.breached], now)
+    resolved_changes = _resolve_recovered(db, [item for item in items if not item.breached], now)
+    opened_tenants = [change.tenant_id for change in upserted if change.previous is None]
+    resolved_tenants = [change.tenant_id for change in resolved_changes]
 
-    for item in payload.items:
-        alert = (
-            db.query(Alert)
-            .filter(
-                Alert.device_id == item.device_id,
-                Alert.tenant_id == item.tenant_id,
-                Alert.metric_key == item.metric_key,
-                Alert.status.in_([AlertStatus.open, AlertStatus.acked]),
-            )
-            .first()
-        )
-
-        if item.breached:
-            if alert:
-                alert.value = item.value
-                alert.threshold_min = item.threshold_min
-                alert.threshold_max = item.threshold_max
-                alert.message = item.message
-                alert.severity = item.severity
-                updated += 1
-            else:
-                alert = Alert(
-                    tenant_id=item.tenant_id,
-                    device_id=item.device_id,
-                    metric_key=item.metric_key,
-                    message=item.message,
-                    value=item.value,
-                    threshold_min=item.threshold_min,
-                    threshold_max=item.threshold_max,
-                    severity=item.severity,
-                    status=AlertStatus.open,
-                )
-                db.add(alert)
-                created += 1
-        else:
-            if alert:
-                alert.status = AlertStatus.resolved
-                alert.resolved_at = now
-                alert.value = item.value
-                alert.threshold_min = item.threshold_min
-                alert.threshold_max = item.threshold_max
-                alert.message = item.message
-                resolved += 1
-
+    rollup = AlertRollup()
+    counters = AlertCounters()
+    for tenant_id in opened_tenants:
+        rollup.opened(tenant_id, now)
+    for tenant_id in resolved_tenants:
+        rollup.resolved(tenant_id, now)
+    for change in upserted + resolved_changes:
+        counters.move(change.tenant_id, change.previous, change.current)
+    rollup.flush(db)
+    counters.flush(db)
     db.commit()
-    return InternalAlertEvaluationResponse(created=created, updated=updated, resolved=resolved)
+
+    for tenant_id in opened_tenants:
+        dashboard_state.record_alert_opened(tenant_id, now)
+    for tenant_id in resolved_tenants:
+        dashboard_state.record_alert_resolved(tenant_id, now)
+    for tenant_id in {change.tenant_id for change in upserted} | set(resolved_tenants):
+        tenant_versions.bump(tenant_id, ALERTS)
+    # Severity-only refreshes do not change what the worker tracks.
+    monitoring_changes.record_alerts(
+        (change.device_id, change.metric_key)
+        for change in upserted + resolved_changes
+        if change.previous is None or change.previous[0] != change.current[0]
+    )
+    alert_events.publish(event for event in (_alert_event(change, now) for change in upserted + resolved_changes) if event)
+    return InternalAlertEvaluationResponse(
+        created=len(opened_tenants),
+        updated=len(upserted) - len(opened_tenants),
+        resolved=len(resolved_tenants),
+    )
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict
+from uuid import UUID
+
+from fastapi import APIRouter, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+
+from ..core.errors import api_error
+from ..db.models import User
+from ..db.session import SessionLocal
+from ..routes.auth import resolve_user_from_token
+from ..routes.dashboard import read_dashboard_counts, summary_fields
+from ..services.alert_events import alert_events
+from ..services.dashboard_state import dashboard_state
+
+router = APIRouter(prefix="/stream", tags=["stream"])
+
+# Changes arriving within this window are folded into one event.
+COALESCE_SEC = 1.0
+# Fleet health ages without any event, so the stream also re-reads the counters this often.
+TICK_SEC = 5.0
+KEEPALIVE_SEC = 15.0
+
+
+def _authenticate(request: Request, token: str | None) -> User:
+    # EventSource cannot set headers, so browsers pass the JWT as ?token=.
+    if token is None:
+        scheme, _, credentials = request.headers.get("authorization", "").partition(" ")
+        if scheme.lower() == "bearer" and credentials:
+            token = credentials
+    if not token:
+        raise api_error("Not authenticated", status_code=status.HTTP_401_UNAUTHORIZED)
+    db = SessionLocal()
+    try:
+        return resolve_user_from_token(db, token)
+    finally:
+        db.close()
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+async def _dashboard_events(tenant_id: UUID) -> AsyncIterator[str]:
+    loop = asyncio.get_running_loop()
+    changed = dashboard_state.listen(tenant_id)
+    try:
+        counts = await read_dashboard_counts(tenant_id)
+        previous: Dict[str, Any] = jsonable_encoder(summary_fields(counts, datetime.now(timezone.utc)))
+        _, seq = dashboard_state.buckets_since(tenant_id, 0)
+        yield _sse("snapshot", previous)
+
+        last_sent = loop.time()
+        while True:
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=TICK_SEC)
+            except asyncio.TimeoutError:
+                pass
+            # Hold back so a burst of ingest/alert hooks yields one event per COALESCE_SEC.
+            delay = last_sent + COALESCE_SEC - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            changed.clear()
+
+            counts = dashboard_state.read(tenant_id)
+            if counts is None:
+                # Tenant was never loaded into (or dropped from) the state; reload it once.
+                counts = await read_dashboard_counts(tenant_id)
+            current = jsonable_encoder(summary_fields(counts, datetime.now(timezone.utc)))
+            delta = {key: value for key, value in current.items() if previous.get(key) != value}
+            points, seq = dashboard_state.buckets_since(tenant_id, seq)
+            if points:
+                delta["telemetry_series"] = jsonable_encoder(points)
+            previous = current
+
+            if delta:
+                yield _sse("delta", delta)
+                last_sent = loop.time()
+            elif loop.time() - last_sent >= KEEPALIVE_SEC:
+                yield ": keepalive\n\n"
+                last_sent = loop.time()
+    finally:
+        dashboard_state.unlisten(tenant_id, changed)
+
+
+@router.get("/dashboard")
+async def stream_dashboard(request: Request, token: str | None = Query(default=None)):
+    """Push dashboard summary changes for the caller's tenant.
+
+    Sends one ``snapshot`` event with the ``/dashboard/summary`` fields (minus the telemetry
+    series), then ``delta`` events carrying only the fields that changed plus any newly closed
+    ``telemetry_series`` buckets. Events are driven by in-memory state, so an idle stream issues
+    no database queries.
+    """
+
+    user = await run_in_threadpool(_authenticate, request, token)
+    return StreamingResponse(
+        _dashboard_events(user.tenant_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _alert_events(tenant_id: UUID) -> AsyncIterator[str]:
+    subscription = alert_events.subscribe(tenant_id)
+    try:
+        # Subscribed before telling the client to load, so nothing committed after its fetch is missed.
+        yield _sse("resync", {})
+        while True:
+            try:
+                events = await asyncio.wait_for(subscription.get(), timeout=KEEPALIVE_SEC)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if events is None:
+                yield _sse("resync", {})
+                continue
+            for event in events:
+                yield _sse("alert", event.payload())
+            # Let changes landing while the client drains accumulate (and collapse) in the buffer.
+            await asyncio.sleep(COALESCE_SEC)
+    finally:
+        alert_events.unsubscribe(tenant_id, subscription)
+
+
+@router.get("/alerts")
+async def stream_alerts(request: Request, token: str | None = Query(default=None)):
+    """Push alert changes for the caller's tenant.
+
+    Emits ``alert`` events (``type`` created, updated, acked or resolved, with the alert's current
+    status, severity, value and message) as they commit. ``resync`` is sent on connect and whenever
+    the client fell more than ``ALERT_STREAM_BUFFER`` alerts behind; reload ``GET /alerts`` then.
+    """
+
+    user = await run_in_threadpool(_authenticate, request, token)
+    return StreamingResponse(
+        _alert_events(user.tenant_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
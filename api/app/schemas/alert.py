@@ -1,9 +1,10 @@
 from __future__ import annotations
 
 from datetime import datetime
+from typing import Literal
 from uuid import UUID
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 
 from ..db.models import AlertSeverity, AlertStatus
 
@@ -36,4 +37,25 @@ class AlertSummary(BaseModel):
 
 class AlertListResponse(BaseModel):
     items: list[AlertResponse]
-    summary: AlertSummary
+    summary: AlertSummary | None = None
+    next_cursor: str | None = None
+
+
+class AlertBulkFilter(BaseModel):
+    device_id: UUID | None = None
+    metric_key: str | None = None
+    status: AlertStatus | None = None
+    created_before: datetime | None = None
+
+
+class AlertBulkRequest(BaseModel):
+    action: Literal["ack", "resolve"]
+    ids: list[UUID] | None = Field(default=None, min_length=1, max_length=10_000)
+    filter: AlertBulkFilter | None = None
+
+
+class AlertBulkResponse(BaseModel):
+    action: Literal["ack", "resolve"]
+    updated: int
+    # Only for id lists: ids that were unknown or already acked/resolved.
+    skipped: int = 0
@@ -1,11 +1,11 @@
 from __future__ import annotations
 
-from typing import List
+from typing import Dict, List
 from uuid import UUID
 
 from pydantic import BaseModel, Field
 
-from ..db.models import AlertSeverity, AlertStatus
+from ..db.models import AlertSeverity, AlertStatus, ThresholdAggregate
 
 
 class InternalThresholdItem(BaseModel):
@@ -14,6 +14,8 @@ class InternalThresholdItem(BaseModel):
     max_value: float | None = None
     hysteresis: float | None = None
     enabled: bool = True
+    aggregate: ThresholdAggregate = ThresholdAggregate.last
+    window_sec: int | None = None
 
 
 class InternalDeviceSnapshot(BaseModel):
@@ -30,7 +32,13 @@ class InternalActiveAlert(BaseModel):
 
 
 class InternalMonitoringSnapshotResponse(BaseModel):
+    # Pass back as ?since= to receive only what changed. When ``full`` is false, ``devices`` holds
+    # the changed devices, ``removed_devices`` those to drop, and ``active_alerts`` the alert keys
+    # whose state changed (``resolved`` meaning no longer active).
+    version: str
+    full: bool = True
     devices: List[InternalDeviceSnapshot]
+    removed_devices: List[UUID] = []
     active_alerts: List[InternalActiveAlert]
 
 
@@ -54,3 +62,27 @@ class InternalAlertEvaluationResponse(BaseModel):
     created: int
     updated: int
     resolved: int
+
+
+class InternalTelemetryQueryStats(BaseModel):
+    executed: int
+    coalesced: int
+    in_flight: int
+
+
+class InternalQueryProfileEntry(BaseModel):
+    fingerprint: str
+    count: int
+    errors: int
+    total_ms: float
+    mean_ms: float
+    max_ms: float
+    server_mean_ms: float | None = None
+    rows: int
+    tables: int
+    histogram: Dict[str, int]
+
+
+class InternalQueryProfileResponse(BaseModel):
+    slow_query_ms: float
+    items: List[InternalQueryProfileEntry]
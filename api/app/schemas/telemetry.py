@@ -48,6 +48,17 @@ class TelemetryLastResponse(BaseModel):
     metrics: Dict[str, TelemetryLastMetric]
 
 
+class TelemetryLastBatchItem(BaseModel):
+    device_id: UUID
+    timestamp: datetime | None
+    values: Dict[str, float | None]
+
+
+class TelemetryLastBatchResponse(BaseModel):
+    units: Dict[str, str]
+    items: List[TelemetryLastBatchItem]
+
+
 class TelemetryRangePoint(BaseModel):
     timestamp: datetime
     value: float | None
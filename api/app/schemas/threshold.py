@@ -6,6 +6,8 @@ from uuid import UUID
 
 from pydantic import BaseModel, ConfigDict, Field
 
+from ..db.models import ThresholdAggregate
+
 
 class ThresholdBase(BaseModel):
     metric_key: str = Field(min_length=1, max_length=50)
@@ -13,6 +15,8 @@ class ThresholdBase(BaseModel):
     max_value: float | None = Field(default=None)
     hysteresis: float | None = Field(default=None)
     enabled: bool = True
+    aggregate: ThresholdAggregate = ThresholdAggregate.last
+    window_sec: int | None = Field(default=None, ge=10, le=86_400)
 
 
 class ThresholdUpdateItem(ThresholdBase):
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List
+from uuid import UUID
+
+from sqlalchemy import delete, insert, select
+
+from ..db.models import Alert, AlertArchive, AlertStatus
+from ..db.session import SessionLocal
+from .alert_counters import AlertCounters
+from .tenant_versions import ALERTS, tenant_versions
+
+logger = logging.getLogger("iot_portal.api.alerts")
+
+_ARCHIVED_COLUMNS = (
+    "id",
+    "tenant_id",
+    "device_id",
+    "metric_key",
+    "status",
+    "severity",
+    "message",
+    "value",
+    "threshold_min",
+    "threshold_max",
+    "created_at",
+    "acked_at",
+    "resolved_at",
+)
+
+
+def archive_resolved_batch(cutoff: datetime, batch_size: int) -> List[UUID]:
+    """Move up to ``batch_size`` alerts resolved before ``cutoff`` into ``alerts_archive``.
+
+    DELETE .. RETURNING feeds the INSERT in a single statement, so a row is never in both tables.
+    Returns the tenant of every moved row; empty once nothing is left to move.
+    """
+
+    candidates = (
+        select(Alert.id)
+        .where(Alert.status == AlertStatus.resolved, Alert.resolved_at < cutoff)
+        .order_by(Alert.resolved_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    moved = (
+        delete(Alert)
+        .where(Alert.id.in_(candidates.scalar_subquery()))
+        .returning(*(getattr(Alert, name) for name in _ARCHIVED_COLUMNS))
+        .cte("moved")
+    )
+    statement = (
+        insert(AlertArchive)
+        .from_select(_ARCHIVED_COLUMNS, select(*(moved.c[name] for name in _ARCHIVED_COLUMNS)))
+        .returning(AlertArchive.tenant_id, AlertArchive.severity)
+    )
+    db = SessionLocal()
+    try:
+        counters = AlertCounters()
+        tenants: List[UUID] = []
+        for tenant_id, severity in db.execute(statement):
+            counters.move(tenant_id, (AlertStatus.resolved, severity), None)
+            tenants.append(tenant_id)
+        counters.flush(db)
+        db.commit()
+        return tenants
+    finally:
+        db.close()
+
+
+def archive_resolved_alerts(retention_days: int, batch_size: int) -> int:
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    archived = 0
+    while True:
+        tenants = archive_resolved_batch(cutoff, batch_size)
+        if not tenants:
+            return archived
+        archived += len(tenants)
+        for tenant_id in set(tenants):
+            tenant_versions.bump(tenant_id, ALERTS)
+
+
+async def run_archiver(retention_days: int, batch_size: int, interval_sec: float) -> None:
+    """Periodically archive old resolved alerts; the dashboard trend reads ``alert_daily_counts``."""
+
+    if retention_days <= 0:
+        return
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            archived = await loop.run_in_executor(None, archive_resolved_alerts, retention_days, batch_size)
+            if archived:
+                logger.info("archived %s resolved alerts", archived)
+        except Exception:  # noqa: BLE001
+            logger.exception("alert archiving failed")
+        await asyncio.sleep(interval_sec)
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import defaultdict
+from typing import DefaultDict, Dict, Tuple
+from uuid import UUID
+
+from sqlalchemy import delete, func, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from ..db.models import ACTIVE_ALERT_STATUSES, Alert, AlertCounter, AlertSeverity, AlertStatus
+from ..db.session import SessionLocal
+
+logger = logging.getLogger("iot_portal.api.alerts")
+
+CounterKey = Tuple[UUID, AlertStatus, AlertSeverity]
+
+
+class AlertCounters:
+    """Deltas for ``alert_counters``, flushed inside the caller's transaction.
+
+    Record every status or severity change while mutating alerts, then call :meth:`flush` before
+    ``db.commit()`` so the counters commit (or roll back) together with the alert rows.
+    """
+
+    def __init__(self) -> None:
+        self._deltas: DefaultDict[CounterKey, int] = defaultdict(int)
+
+    def move(
+        self,
+        tenant_id: UUID,
+        previous: Tuple[AlertStatus, AlertSeverity] | None,
+        current: Tuple[AlertStatus, AlertSeverity] | None,
+    ) -> None:
+        """Account for one alert going from ``previous`` to ``current`` (None = not in ``alerts``)."""
+
+        if previous == current:
+            return
+        if previous is not None:
+            self._deltas[(tenant_id, *previous)] -= 1
+        if current is not None:
+            self._deltas[(tenant_id, *current)] += 1
+
+    def flush(self, db: Session) -> None:
+        deltas = {}
+        for key, delta in self._deltas.items():
+            if None in key:
+                # A caller lost track of the alert's status or severity; the repair job recounts it.
+                logger.warning("skipping alert counter delta with incomplete key %s", key)
+                continue
+            if delta:
+                deltas[key] = delta
+        self._deltas.clear()
+        rows = [
+            {"tenant_id": tenant_id, "status": status, "severity": severity, "count": delta}
+            # Sorted so concurrent writers lock the same rows in the same order.
+            for (tenant_id, status, severity), delta in sorted(
+                deltas.items(), key=lambda item: (str(item[0][0]), item[0][1].value, item[0][2].value)
+            )
+        ]
+        if not rows:
+            return
+        statement = insert(AlertCounter).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=[AlertCounter.tenant_id, AlertCounter.status, AlertCounter.severity],
+            set_={"count": AlertCounter.count + statement.excluded.count},
+        )
+        db.execute(statement)
+
+
+def read_alert_counts(db: Session, tenant_id: UUID) -> Dict[Tuple[AlertStatus, AlertSeverity], int]:
+    rows = db.query(AlertCounter.status, AlertCounter.severity, AlertCounter.count).filter(
+        AlertCounter.tenant_id == tenant_id
+    )
+    return {(row.status, row.severity): row.count for row in rows}
+
+
+def count_active_alerts(db: Session, tenant_id: UUID) -> int:
+    return (
+        db.query(func.coalesce(func.sum(AlertCounter.count), 0))
+        .filter(AlertCounter.tenant_id == tenant_id, AlertCounter.status.in_(ACTIVE_ALERT_STATUSES))
+        .scalar()
+    )
+
+
+def repair_alert_counters() -> int:
+    """Recount ``alert_counters`` from ``alerts``; returns how many counters were corrected.
+
+    Takes no locks writers wait on. Both tables are read in one REPEATABLE READ snapshot, so the
+    stored and actual counts agree on which writers had committed. Each drifted counter is then
+    corrected with a compare-and-set on the count that was read. A writer that committed in
+    between has moved that count, so its key is left for the next run.
+    """
+
+    db = SessionLocal()
+    try:
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        stored: Dict[CounterKey, int] = {
+            (row.tenant_id, row.status, row.severity): row.count
+            for row in db.query(AlertCounter.tenant_id, AlertCounter.status, AlertCounter.severity, AlertCounter.count)
+        }
+        actual: Dict[CounterKey, int] = {
+            (row.tenant_id, row.status, row.severity): row.total
+            for row in db.query(Alert.tenant_id, Alert.status, Alert.severity, func.count().label("total")).group_by(
+                Alert.tenant_id, Alert.status, Alert.severity
+            )
+        }
+        db.commit()
+
+        corrected = 0
+        for key in stored.keys() | actual.keys():
+            seen, count = stored.get(key), actual.get(key, 0)
+            if (seen or 0) == count:
+                continue
+            tenant_id, status, severity = key
+            matches = (
+                AlertCounter.tenant_id == tenant_id,
+                AlertCounter.status == status,
+                AlertCounter.severity == severity,
+            )
+            if seen is None:
+                # No counter row yet; a writer that created one meanwhile wins.
+                statement = (
+                    insert(AlertCounter)
+                    .values(tenant_id=tenant_id, status=status, severity=severity, count=count)
+                    .on_conflict_do_nothing(index_elements=[AlertCounter.tenant_id, AlertCounter.status, AlertCounter.severity])
+                )
+            elif count:
+                statement = update(AlertCounter).where(*matches, AlertCounter.count == seen).values(count=count)
+            else:
+                statement = delete(AlertCounter).where(*matches, AlertCounter.count == seen)
+            corrected += db.execute(statement).rowcount
+            # One short transaction per key so no counter row stays locked across the loop.
+            db.commit()
+        return corrected
+    finally:
+        db.close()
+
+
+async def run_counter_repair(interval_sec: float) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval_sec)
+        try:
+            drifted = await loop.run_in_executor(None, repair_alert_counters)
+            if drifted:
+                logger.warning("repaired %s drifted alert counters", drifted)
+        except Exception:  # noqa: BLE001
+            logger.exception("alert counter repair failed")
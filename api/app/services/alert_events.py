@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import DefaultDict, Dict, Iterable, List, Set
+from uuid import UUID
+
+from ..core.config import get_settings
+from ..db.models import AlertSeverity, AlertStatus
+
+CREATED = "created"
+UPDATED = "updated"
+ACKED = "acked"
+RESOLVED = "resolved"
+
+
+@dataclass(frozen=True)
+class AlertEvent:
+    type: str
+    tenant_id: UUID
+    alert_id: UUID
+    device_id: UUID
+    metric_key: str
+    status: AlertStatus
+    severity: AlertSeverity
+    at: datetime
+    value: float | None = None
+    message: str | None = None
+
+    def payload(self) -> Dict[str, object]:
+        return {
+            "type": self.type,
+            "id": str(self.alert_id),
+            "device_id": str(self.device_id),
+            "metric_key": self.metric_key,
+            "status": self.status.value,
+            "severity": self.severity.value,
+            "at": self.at.isoformat(),
+            "value": self.value,
+            "message": self.message,
+        }
+
+
+class AlertSubscription:
+    """One client's pending events, owned by the event loop that serves its stream.
+
+    Pending events are keyed by alert, so repeated changes to the same alert collapse into one
+    carrying its latest state. When more than ``capacity`` distinct alerts are pending the buffer
+    is dropped and the next :meth:`get` returns None: the client must refetch ``GET /alerts``.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, capacity: int) -> None:
+        self.loop = loop
+        self._capacity = capacity
+        self._pending: "OrderedDict[UUID, AlertEvent]" = OrderedDict()
+        self._overflowed = False
+        self._ready = asyncio.Event()
+
+    def _offer(self, events: List[AlertEvent]) -> None:
+        # Runs on self.loop only.
+        if self._overflowed:
+            return
+        for event in events:
+            pending = self._pending.get(event.alert_id)
+            if pending is not None and event.type == UPDATED:
+                # Keep "created"/"acked" so the client still sees the transition.
+                event = replace(event, type=pending.type)
+            self._pending[event.alert_id] = event
+            if len(self._pending) > self._capacity:
+                self._pending.clear()
+                self._overflowed = True
+                break
+        self._ready.set()
+
+    async def get(self) -> List[AlertEvent] | None:
+        """Wait for pending events; None means events were dropped and the client must resync."""
+
+        await self._ready.wait()
+        self._ready.clear()
+        if self._overflowed:
+            self._overflowed = False
+            return None
+        events = list(self._pending.values())
+        self._pending.clear()
+        return events
+
+
+class AlertEventHub:
+    """Fans committed alert changes out to the tenant's SSE subscribers."""
+
+    def __init__(self, capacity: int = 1000) -> None:
+        self.capacity = capacity
+        self._subscribers: Dict[UUID, Set[AlertSubscription]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, tenant_id: UUID) -> AlertSubscription:
+        subscription = AlertSubscription(asyncio.get_running_loop(), self.capacity)
+        with self._lock:
+            self._subscribers.setdefault(tenant_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, tenant_id: UUID, subscription: AlertSubscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(tenant_id)
+            if not subscribers:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                self._subscribers.pop(tenant_id, None)
+
+    def publish(self, events: Iterable[AlertEvent]) -> None:
+        """Deliver events from any thread; call after the changes have committed."""
+
+        by_tenant: DefaultDict[UUID, List[AlertEvent]] = defaultdict(list)
+        with self._lock:
+            if not self._subscribers:
+                return
+            for event in events:
+                if event.tenant_id in self._subscribers:
+                    by_tenant[event.tenant_id].append(event)
+            targets = [(subscription, by_tenant[tenant_id]) for tenant_id in by_tenant for subscription in self._subscribers[tenant_id]]
+        for subscription, tenant_events in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._offer, tenant_events)
+            except RuntimeError:
+                pass  # loop already closed; the stream is gone
+
+
+alert_events = AlertEventHub(get_settings().alert_stream_buffer)
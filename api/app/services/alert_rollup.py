@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from typing import DefaultDict, Dict, List, Tuple
+from uuid import UUID
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from ..db.models import AlertDailyCount
+
+
+def rollup_day(at: datetime) -> date:
+    return at.astimezone(timezone.utc).date()
+
+
+class AlertRollup:
+    """Opened/resolved deltas for ``alert_daily_counts``, flushed inside the caller's transaction.
+
+    Collect events while mutating alerts, then call :meth:`flush` before ``db.commit()`` so the
+    rollup and the alert rows commit (or roll back) together.
+    """
+
+    def __init__(self) -> None:
+        self._deltas: DefaultDict[Tuple[UUID, date], List[int]] = defaultdict(lambda: [0, 0])
+
+    def opened(self, tenant_id: UUID, at: datetime) -> None:
+        self._deltas[(tenant_id, rollup_day(at))][0] += 1
+
+    def resolved(self, tenant_id: UUID, at: datetime) -> None:
+        self._deltas[(tenant_id, rollup_day(at))][1] += 1
+
+    def flush(self, db: Session) -> None:
+        if not self._deltas:
+            return
+        # Sorted so concurrent writers lock the same rows in the same order.
+        rows: List[Dict[str, object]] = []
+        for tenant_id, day in sorted(self._deltas, key=lambda key: (str(key[0]), key[1])):
+            opened, resolved = self._deltas[(tenant_id, day)]
+            rows.append({"tenant_id": tenant_id, "day": day, "opened": opened, "resolved": resolved})
+        statement = insert(AlertDailyCount).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=[AlertDailyCount.tenant_id, AlertDailyCount.day],
+            set_={
+                "opened": AlertDailyCount.opened + statement.excluded.opened,
+                "resolved": AlertDailyCount.resolved + statement.excluded.resolved,
+            },
+        )
+        db.execute(statement)
+        self._deltas.clear()
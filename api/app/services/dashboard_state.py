@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Mapping, Tuple
+from uuid import UUID
+
+from ..schemas.dashboard import DashboardTelemetryPoint
+
+logger = logging.getLogger("iot_portal.api.dashboard")
+
+ONLINE_WINDOW = timedelta(minutes=5)
+WARNING_WINDOW = timedelta(minutes=30)
+TREND_DAYS = 7
+# Width of the telemetry chart buckets; matches TELEMETRY_INTERVAL in routes.dashboard.
+SERIES_INTERVAL = timedelta(minutes=5)
+SERIES_METRICS = ("power_w", "current_a")
+MAX_STREAM_BUCKETS = 12
+# Device clocks may run this far ahead before their timestamps are clamped for bucketing.
+MAX_CLOCK_SKEW = timedelta(seconds=30)
+
+
+@dataclass
+class DashboardSnapshot:
+    """Authoritative per-tenant figures loaded from the database."""
+
+    status_counts: Dict[str, int]
+    recent_seen: Dict[UUID, datetime]
+    active_alerts: int
+    opened_by_day: Dict[date, int]
+    resolved_by_day: Dict[date, int]
+
+
+@dataclass(frozen=True)
+class DashboardCounts:
+    status_counts: Dict[str, int]
+    total_devices: int
+    healthy: int
+    warning: int
+    critical: int
+    active_alerts: int
+    resolved_today: int
+    opened_by_day: Dict[date, int]
+
+
+@dataclass
+class _SeriesBucket:
+    """Running mean of the chart metrics for one SERIES_INTERVAL window, fed by ingest."""
+
+    start: datetime
+    sums: Dict[str, float] = field(default_factory=dict)
+    counts: Dict[str, int] = field(default_factory=dict)
+
+    def add(self, metrics: Mapping[str, float | None]) -> None:
+        for metric in SERIES_METRICS:
+            value = metrics.get(metric)
+            if value is not None:
+                self.sums[metric] = self.sums.get(metric, 0.0) + value
+                self.counts[metric] = self.counts.get(metric, 0) + 1
+
+    def close(self) -> DashboardTelemetryPoint:
+        # Labelled with the window stop, like Flux aggregateWindow.
+        means = {metric: self.sums[metric] / self.counts[metric] for metric in self.counts}
+        return DashboardTelemetryPoint(
+            timestamp=self.start + SERIES_INTERVAL,
+            power_w=means.get("power_w"),
+            current_a=means.get("current_a"),
+        )
+
+
+def _bucket_start(timestamp: datetime) -> datetime:
+    epoch = timestamp.astimezone(timezone.utc).timestamp()
+    step = SERIES_INTERVAL.total_seconds()
+    return datetime.fromtimestamp(epoch - epoch % step, tz=timezone.utc)
+
+
+@dataclass
+class _TenantSummary:
+    status_counts: Dict[str, int]
+    active_alerts: int
+    opened_by_day: Dict[date, int]
+    resolved_by_day: Dict[date, int]
+    # Devices seen within WARNING_WINDOW, plus the same entries ordered by timestamp so the
+    # online/warning split is two bisects instead of a scan.
+    seen: Dict[UUID, datetime] = field(default_factory=dict)
+    seen_order: List[Tuple[datetime, UUID]] = field(default_factory=list)
+    series: List[DashboardTelemetryPoint] | None = None
+    series_at: datetime | None = None
+    # Closed ingest buckets for stream subscribers, numbered so each stream can ask for what is new.
+    bucket: _SeriesBucket | None = None
+    closed_buckets: List[Tuple[int, DashboardTelemetryPoint]] = field(default_factory=list)
+    bucket_seq: int = 0
+
+    def mark_seen(self, device_id: UUID, timestamp: datetime) -> None:
+        previous = self.seen.get(device_id)
+        if previous is not None:
+            if timestamp <= previous:
+                return
+            index = bisect.bisect_left(self.seen_order, (previous, device_id))
+            del self.seen_order[index]
+        self.seen[device_id] = timestamp
+        bisect.insort(self.seen_order, (timestamp, device_id))
+
+    def prune(self, now: datetime) -> None:
+        expired = bisect.bisect_left(self.seen_order, (now - WARNING_WINDOW,))
+        if expired:
+            for _, device_id in self.seen_order[:expired]:
+                self.seen.pop(device_id, None)
+            del self.seen_order[:expired]
+        if self.bucket is not None and now >= self.bucket.start + SERIES_INTERVAL:
+            self.close_bucket()
+        oldest_day = (now - timedelta(days=TREND_DAYS - 1)).date()
+        for bucket in (self.opened_by_day, self.resolved_by_day):
+            for day in [day for day in bucket if day < oldest_day]:
+                bucket.pop(day, None)
+
+    def close_bucket(self) -> None:
+        if self.bucket is not None and self.bucket.counts:
+            self.bucket_seq += 1
+            self.closed_buckets.append((self.bucket_seq, self.bucket.close()))
+            del self.closed_buckets[:-MAX_STREAM_BUCKETS]
+        self.bucket = None
+
+
+class DashboardState:
+    """Per-tenant dashboard figures kept in memory and maintained incrementally.
+
+    Tenants are loaded from the database on first read; afterwards device CRUD, ingest
+    (``last_seen_at``) and alert open/resolve events adjust the counters directly, and a periodic
+    reconciliation reloads every tenant to correct drift (for example from events that raced a
+    reload, or writes made by another API process). Every change also wakes the tenant's
+    ``/stream/dashboard`` listeners; hooks run on threadpool threads, so listeners are woken
+    through their own event loop.
+    """
+
+    def __init__(self) -> None:
+        self._tenants: Dict[UUID, _TenantSummary] = {}
+        self._listeners: Dict[UUID, set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = {}
+        self._lock = threading.Lock()
+
+    def install(self, tenant_id: UUID, snapshot: DashboardSnapshot) -> None:
+        summary = _TenantSummary(
+            status_counts=dict(snapshot.status_counts),
+            active_alerts=snapshot.active_alerts,
+            opened_by_day=dict(snapshot.opened_by_day),
+            resolved_by_day=dict(snapshot.resolved_by_day),
+        )
+        for device_id, timestamp in snapshot.recent_seen.items():
+            summary.mark_seen(device_id, timestamp)
+        with self._lock:
+            previous = self._tenants.get(tenant_id)
+            if previous is not None:
+                summary.series, summary.series_at = previous.series, previous.series_at
+                summary.bucket, summary.closed_buckets = previous.bucket, previous.closed_buckets
+                summary.bucket_seq = previous.bucket_seq
+            self._tenants[tenant_id] = summary
+        self._notify(tenant_id)
+
+    def tenants(self) -> List[UUID]:
+        with self._lock:
+            return list(self._tenants)
+
+    def read(self, tenant_id: UUID, now: datetime | None = None) -> DashboardCounts | None:
+        now = now or datetime.now(timezone.utc)
+        with self._lock:
+            summary = self._tenants.get(tenant_id)
+            if summary is None:
+                return None
+            summary.prune(now)
+            recent = len(summary.seen_order)
+            healthy = recent - bisect.bisect_left(summary.seen_order, (now - ONLINE_WINDOW,))
+            total = sum(summary.status_counts.values())
+            return DashboardCounts(
+                status_counts=dict(summary.status_counts),
+                total_devices=total,
+                healthy=healthy,
+                warning=recent - healthy,
+                critical=max(total - recent, 0),
+                active_alerts=max(summary.active_alerts, 0),
+                resolved_today=summary.resolved_by_day.get(now.date(), 0),
+                opened_by_day=dict(summary.opened_by_day),
+            )
+
+    # Telemetry chart cache ---------------------------------------------
+    def cached_series(self, tenant_id: UUID, max_age: timedelta) -> List[DashboardTelemetryPoint] | None:
+        with self._lock:
+            summary = self._tenants.get(tenant_id)
+            if summary is None or summary.series_at is None:
+                return None
+            if datetime.now(timezone.utc) - summary.series_at > max_age:
+                return None
+            return summary.series
+
+    def store_series(self, tenant_id: UUID, series: List[DashboardTelemetryPoint]) -> None:
+        with self._lock:
+            summary = self._tenants.get(tenant_id)
+            if summary is not None:
+                summary.series = series
+                summary.series_at = datetime.now(timezone.utc)
+
+    def buckets_since(self, tenant_id: UUID, seq: int) -> Tuple[List[DashboardTelemetryPoint], int]:
+        """Closed telemetry buckets numbered after ``seq``, plus the latest number."""
+
+        with self._lock:
+            summary = self._tenants.get(tenant_id)
+            if summary is None:
+                return [], seq
+            summary.prune(datetime.now(timezone.utc))
+            points = [point for number, point in summary.closed_buckets if number > seq]
+            return points, summary.bucket_seq
+
+    # Stream listeners ---------------------------------------------------
+    def listen(self, tenant_id: UUID) -> asyncio.Event:
+        event = asyncio.Event()
+        with self._lock:
+            self._listeners.setdefault(tenant_id, set()).add((asyncio.get_running_loop(), event))
+        return event
+
+    def unlisten(self, tenant_id: UUID, event: asyncio.Event) -> None:
+        with self._lock:
+            listeners = self._listeners.get(tenant_id)
+            if not listeners:
+                return
+            for listener in [listener for listener in listeners if listener[1] is event]:
+                listeners.discard(listener)
+            if not listeners:
+                self._listeners.pop(tenant_id, None)
+
+    def _notify(self, tenant_id: UUID) -> None:
+        with self._lock:
+            listeners = list(self._listeners.get(tenant_id, ()))
+        for loop, event in listeners:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass  # loop already closed; the stream is gone
+
+    # Incremental events -------------------------------------------------
+    def record_device_seen(self, tenant_id: UUID, device_id: UUID, timestamp: datetime) -> None:
+        with self._lock:
+            summary = self._tenants.get(tenant_id)
+            if summary is not None:
+                summary.mark_seen(device_id, timestamp)
+        self._notify(tenant_id)
+
+    def record_telemetry(self, tenant_id: UUID, timestamp: datetime, metrics: Mapping[str, float | None]) -> None:
+        # Buckets open and close on device-reported time. A clock running ahead would otherwise
+        # close the tenant's open bucket early and strand every other device's samples.
+        start = _bucket_start(min(timestamp, datetime.now(timezone.utc) + MAX_CLOCK_SKEW))
+        closed = False
+        with self._lock:
+            summary = self._tenants.get(tenant_id)
+            if summary is None:
+                return
+            if summary.bucket is not None and start > summary.bucket.start:
+                summary.close_bucket()
+                closed = True
+            if summary.bucket is None:
+                summary.bucket = _SeriesBucket(start=start)
+            if start == summary.bucket.start:
+                # Samples older than the open bucket only reach the chart through Influx.
+                summary.bucket.add(metrics)
+        if closed:
+            self._notify(tenant_id)
+
+    def record_device_added(self, tenant_id: UUID, status: str) -> None:
+        with self._lock:
+            summary = self._tenants.get(tenant_id)
+            if summary is not None:
+                summary.status_counts[status] = summary.status_counts.get(status, 0) + 1
+        self._notify(tenant_id)
+
+    def record_device_status(self, tenant_id: UUID, previous: str, current: str) -> None:
+        if previous == current:
+            return
+        with self._lock:
+            summary = self._tenants.get(tenant_id)
+            if summary is not None:
+                summary.status_counts[previous] = max(summary.status_counts.get(previous, 0) - 1, 0)
+                summary.status_counts[current] = summary.status_counts.get(current, 0) + 1
+        self._notify(tenant_id)
+
+    def record_alert_opened(self, tenant_id: UUID, at: datetime) -> None:
+        with self._lock:
+            summary = self._tenants.get(tenant_id)
+            if summary is not None:
+                summary.active_alerts += 1
+                day = at.astimezone(timezone.utc).date()
+                summary.opened_by_day[day] = summary.opened_by_day.get(day, 0) + 1
+        self._notify(tenant_id)
+
+    def record_alert_resolved(self, tenant_id: UUID, at: datetime, count: int = 1) -> None:
+        with self._lock:
+            summary = self._tenants.get(tenant_id)
+            if summary is not None:
+                summary.active_alerts -= count
+                day = at.astimezone(timezone.utc).date()
+                summary.resolved_by_day[day] = summary.resolved_by_day.get(day, 0) + count
+        self._notify(tenant_id)
+
+    # Reconciliation -----------------------------------------------------
+    async def run_reconciler(
+        self,
+        load: Callable[[UUID], Awaitable[DashboardSnapshot]],
+        interval_sec: float,
+    ) -> None:
+        while True:
+            await asyncio.sleep(interval_sec)
+            for tenant_id in self.tenants():
+                try:
+                    self.install(tenant_id, await load(tenant_id))
+                except Exception:  # noqa: BLE001
+                    logger.exception("dashboard reconciliation failed for tenant %s", tenant_id)
+
+
+dashboard_state = DashboardState()
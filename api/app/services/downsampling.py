@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+from typing import List, Sequence
+
+import numpy as np
+
+from ..schemas.telemetry import TelemetryRangePoint
+
+MIN_POINTS = 3
+
+
+def lttb(points: Sequence[TelemetryRangePoint], max_points: int) -> List[TelemetryRangePoint]:
+    """Downsample a time series with Largest-Triangle-Three-Buckets, keeping its gaps.
+
+    Every interior run of points without a value is kept as one ``None`` marker (the run's first
+    point), so the chart still breaks there. Each run of values in between gets a share of the
+    remaining budget proportional to its length and is downsampled on its own, keeping its first
+    and last points. When there are too many gaps to fit, the narrowest ones are closed. Leading
+    and trailing points without a value are dropped; there is no line for them to break. The
+    result never holds more than ``max_points`` points.
+    """
+
+    if max_points < MIN_POINTS or len(points) <= max_points:
+        return list(points)
+
+    runs: List[List[TelemetryRangePoint]] = []
+    markers: List[TelemetryRangePoint] = []
+    gap_start: TelemetryRangePoint | None = None
+    for point in points:
+        if point.value is None:
+            if runs and gap_start is None:
+                gap_start = point
+            continue
+        if gap_start is not None:
+            markers.append(gap_start)
+            gap_start = None
+            runs.append([])
+        elif not runs:
+            runs.append([])
+        runs[-1].append(point)
+    if not runs:
+        return []
+
+    # The outer runs keep both edges and inner runs at least one point, so k gaps need 2k + 3.
+    max_gaps = (max_points - 3) // 2
+    if len(markers) > max_gaps:
+        runs, markers = _close_narrow_gaps(runs, markers, max_gaps)
+
+    floors = [1] * len(runs)
+    floors[0] = floors[-1] = 2
+    quotas = _allocate([len(run) for run in runs], floors, max_points - len(markers))
+    result = _downsample_run(runs[0], quotas[0])
+    for marker, run, quota in zip(markers, runs[1:], quotas[1:]):
+        result.append(marker)
+        result.extend(_downsample_run(run, quota))
+    return result
+
+
+def _close_narrow_gaps(
+    runs: List[List[TelemetryRangePoint]],
+    markers: List[TelemetryRangePoint],
+    keep: int,
+) -> tuple[List[List[TelemetryRangePoint]], List[TelemetryRangePoint]]:
+    # Gap i lies between runs[i] and runs[i + 1]; only the ``keep`` longest in time stay open.
+    widths = [runs[gap + 1][0].timestamp - runs[gap][-1].timestamp for gap in range(len(markers))]
+    kept = set(sorted(range(len(markers)), key=lambda gap: widths[gap], reverse=True)[:keep])
+    merged_runs = [list(runs[0])]
+    merged_markers: List[TelemetryRangePoint] = []
+    for gap, marker in enumerate(markers):
+        if gap in kept:
+            merged_markers.append(marker)
+            merged_runs.append(list(runs[gap + 1]))
+        else:
+            merged_runs[-1].extend(runs[gap + 1])
+    return merged_runs, merged_markers
+
+
+def _allocate(lengths: List[int], floors: List[int], budget: int) -> List[int]:
+    """Split ``budget`` points across runs in proportion to their lengths, each at least its floor."""
+
+    if sum(lengths) <= budget:
+        return list(lengths)
+    floors = [min(length, floor) for length, floor in zip(lengths, floors)]
+    room = [length - floor for length, floor in zip(lengths, floors)]
+    scale = (budget - sum(floors)) / sum(room)
+    shares = [extra * scale for extra in room]
+    quotas = [floor + int(share) for floor, share in zip(floors, shares)]
+    # Largest remainders take the points rounding left over; none of them is at its length.
+    left = budget - sum(quotas)
+    for run in sorted(range(len(quotas)), key=lambda item: shares[item] - int(shares[item]), reverse=True)[:left]:
+        quotas[run] += 1
+    return quotas
+
+
+def _downsample_run(run: List[TelemetryRangePoint], quota: int) -> List[TelemetryRangePoint]:
+    if quota >= len(run):
+        return list(run)
+    if quota < MIN_POINTS:
+        # Edges only; a run squeezed to one point keeps its first.
+        return [run[0], run[-1]][:quota]
+    size = len(run)
+    x = np.fromiter((point.timestamp.timestamp() for point in run), dtype=np.float64, count=size)
+    y = np.fromiter((point.value for point in run), dtype=np.float64, count=size)
+    return [run[index] for index in _lttb_indices(x, y, quota)]
+
+
+def _lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """Indices LTTB keeps of a gap-free series longer than ``max_points`` (at least 3).
+
+    The first and last points are always kept. The remaining points are split into
+    ``max_points - 2`` buckets and from each bucket the point forming the largest triangle with the
+    previously selected point and the next bucket's centroid is retained, which preserves peaks and
+    troughs far better than averaging. Bucket centroids are computed in one vectorized pass; only
+    the per-bucket selection walks the buckets.
+    """
+
+    size = len(x)
+    bucket_count = max_points - 2
+    every = (size - 2) / bucket_count
+    bounds = (np.floor(np.arange(bucket_count + 1) * every) + 1).astype(np.int64)
+    bounds[-1] = size - 1
+    widths = np.diff(bounds)
+
+    # Centroid of every bucket; the "next" centroid for the final bucket is the last point.
+    mean_x = np.add.reduceat(x[: size - 1], bounds[:-1]) / widths
+    mean_y = np.add.reduceat(y[: size - 1], bounds[:-1]) / widths
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = size - 1
+    anchor = 0
+    for bucket in range(bucket_count):
+        start, stop = bounds[bucket], bounds[bucket + 1]
+        ax, ay = x[anchor], y[anchor]
+        areas = np.abs((ax - next_x[bucket]) * (y[start:stop] - ay) - (ax - x[start:stop]) * (next_y[bucket] - ay))
+        anchor = start + int(np.argmax(areas))
+        selected[bucket + 1] = anchor
+
+    return selected
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import secrets
+import threading
+from collections import deque
+from typing import Deque, Iterable, NamedTuple, Set, Tuple
+from uuid import UUID
+
+AlertKey = Tuple[UUID, str]
+
+
+class MonitoringChanges(NamedTuple):
+    version: str
+    devices: Set[UUID]
+    alerts: Set[AlertKey]
+
+
+class MonitoringChangeLog:
+    """Bounded, versioned log of what the worker's monitoring snapshot depends on.
+
+    Writers record device ids (thresholds or name changed) and (device_id, metric_key) alert keys
+    after committing. ``/internal/monitoring/snapshot?since=`` turns the entries newer than the
+    caller's version into a delta. Versions carry a per-process epoch, so a restart, a malformed
+    cursor or a cursor older than the retained window all fall back to a full snapshot.
+    """
+
+    def __init__(self, capacity: int = 100_000) -> None:
+        self._epoch = secrets.token_hex(4)
+        self._capacity = capacity
+        self._version = 0
+        self._evicted_through = 0
+        self._entries: Deque[Tuple[int, UUID | None, AlertKey | None]] = deque()
+        self._lock = threading.Lock()
+
+    def _append(self, device_id: UUID | None, alert: AlertKey | None) -> None:
+        if len(self._entries) >= self._capacity:
+            self._evicted_through = self._entries.popleft()[0]
+        self._version += 1
+        self._entries.append((self._version, device_id, alert))
+
+    def record_devices(self, device_ids: Iterable[UUID]) -> None:
+        with self._lock:
+            for device_id in device_ids:
+                self._append(device_id, None)
+
+    def record_alerts(self, keys: Iterable[AlertKey]) -> None:
+        with self._lock:
+            for key in keys:
+                self._append(None, key)
+
+    def current(self) -> str:
+        with self._lock:
+            return f"{self._epoch}:{self._version}"
+
+    def since(self, cursor: str | None) -> MonitoringChanges | None:
+        """Changes after ``cursor``, or None when the caller needs a full snapshot."""
+
+        if not cursor:
+            return None
+        epoch, _, raw_version = cursor.partition(":")
+        try:
+            since = int(raw_version)
+        except ValueError:
+            return None
+        with self._lock:
+            if epoch != self._epoch or since < self._evicted_through or since > self._version:
+                return None
+            devices: Set[UUID] = set()
+            alerts: Set[AlertKey] = set()
+            # Entries are ordered by version; walk back from the newest until the cursor.
+            for version, device_id, alert in reversed(self._entries):
+                if version <= since:
+                    break
+                if device_id is not None:
+                    devices.add(device_id)
+                if alert is not None:
+                    alerts.add(alert)
+            return MonitoringChanges(version=f"{self._epoch}:{self._version}", devices=devices, alerts=alerts)
+
+
+monitoring_changes = MonitoringChangeLog()
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import bisect
+import logging
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+logger = logging.getLogger("iot_portal.api.telemetry")
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open ended.
+LATENCY_BUCKETS_MS: tuple[float, ...] = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_STRING_LITERAL = re.compile(r'"(?:[^"\\]|\\.)*"')
+_SET_LITERAL = re.compile(r"\[\s*\?(?:\s*,\s*\?)*\s*\]")
+_DURATION_OR_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:ns|us|ms|mo|[smhdwy])?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+PROFILER_PREAMBLE = 'import "profiler"\noption profiler.enabledProfilers = ["query"]\n'
+
+
+def fingerprint(flux: str) -> str:
+    """Normalize a Flux query so executions that differ only by literals share a key."""
+
+    normalized = _STRING_LITERAL.sub("?", flux)
+    normalized = _DURATION_OR_NUMBER.sub("?", normalized)
+    normalized = _SET_LITERAL.sub("[?]", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+def split_profiler_tables(tables: List[Any]) -> tuple[List[Any], float | None]:
+    """Separate ``profiler/query`` tables from results and return the server-side duration (ms)."""
+
+    results: List[Any] = []
+    server_ms: float | None = None
+    for table in tables:
+        records = table.records
+        if records and records[0].values.get("_measurement") == "profiler/query":
+            total_ns = records[0].values.get("TotalDuration")
+            if total_ns is not None:
+                server_ms = (server_ms or 0.0) + float(total_ns) / 1_000_000
+            continue
+        results.append(table)
+    return results, server_ms
+
+
+@dataclass
+class _FingerprintStats:
+    count: int = 0
+    errors: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    server_total_ms: float = 0.0
+    server_samples: int = 0
+    rows: int = 0
+    tables: int = 0
+    histogram: List[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS_MS) + 1))
+
+
+class QueryProfiler:
+    """Per-fingerprint latency histograms plus a slow-query log for Flux queries."""
+
+    def __init__(self, slow_query_ms: float) -> None:
+        self.slow_query_ms = slow_query_ms
+        self._stats: Dict[str, _FingerprintStats] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        flux: str,
+        *,
+        wall_ms: float,
+        server_ms: float | None,
+        rows: int,
+        tables: int,
+        error: bool = False,
+    ) -> None:
+        key = fingerprint(flux)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = _FingerprintStats()
+                self._stats[key] = stats
+            stats.count += 1
+            stats.errors += int(error)
+            stats.total_ms += wall_ms
+            stats.max_ms = max(stats.max_ms, wall_ms)
+            if server_ms is not None:
+                stats.server_total_ms += server_ms
+                stats.server_samples += 1
+            stats.rows += rows
+            stats.tables += tables
+            stats.histogram[bisect.bisect_left(LATENCY_BUCKETS_MS, wall_ms)] += 1
+
+        if wall_ms >= self.slow_query_ms:
+            logger.warning(
+                "slow flux query: %.1fms wall, %s server, %s rows in %s tables: %s",
+                wall_ms,
+                f"{server_ms:.1f}ms" if server_ms is not None else "n/a",
+                rows,
+                tables,
+                key,
+            )
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        labels = [f"le_{int(bound)}ms" for bound in LATENCY_BUCKETS_MS] + ["inf"]
+        with self._lock:
+            items = [(key, stats, list(stats.histogram)) for key, stats in self._stats.items()]
+        entries: List[Dict[str, Any]] = []
+        for key, stats, histogram in items:
+            entries.append(
+                {
+                    "fingerprint": key,
+                    "count": stats.count,
+                    "errors": stats.errors,
+                    "total_ms": round(stats.total_ms, 3),
+                    "mean_ms": round(stats.total_ms / stats.count, 3) if stats.count else 0.0,
+                    "max_ms": round(stats.max_ms, 3),
+                    "server_mean_ms": (
+                        round(stats.server_total_ms / stats.server_samples, 3) if stats.server_samples else None
+                    ),
+                    "rows": stats.rows,
+                    "tables": stats.tables,
+                    "histogram": dict(zip(labels, histogram)),
+                }
+            )
+        entries.sort(key=lambda entry: entry["total_ms"], reverse=True)
+        return entries
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
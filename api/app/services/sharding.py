@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from uuid import UUID
+
+_MASK_64 = 0xFFFFFFFFFFFFFFFF
+
+
+def jump_hash(key: int, buckets: int) -> int:
+    """Jump consistent hash (Lamping & Veach): growing ``buckets`` by one moves only 1/n of keys."""
+
+    key &= _MASK_64
+    bucket, jump = -1, 0
+    while jump < buckets:
+        bucket = jump
+        key = (key * 2862933555777941757 + 1) & _MASK_64
+        jump = int((bucket + 1) * (float(1 << 31) / float((key >> 33) + 1)))
+    return bucket
+
+
+def device_shard(device_id: UUID, shard_count: int) -> int:
+    """Shard that owns ``device_id``; workers started with the same shard_count agree on it.
+
+    Migration 20261019_07 ports this to the SQL function ``device_shard(uuid, integer)`` used by
+    full snapshots; keep the two in step.
+    """
+
+    if shard_count <= 1:
+        return 0
+    # UUID4 ids are random, so the low 64 bits are an evenly distributed key.
+    return jump_hash(device_id.int, shard_count)
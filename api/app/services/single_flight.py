@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Call:
+    done: threading.Event = field(default_factory=threading.Event)
+    result: Any = None
+    error: BaseException | None = None
+
+
+class SingleFlight:
+    """Collapse concurrent calls sharing a key into a single execution.
+
+    The first caller for a key runs the work; callers arriving while it is in flight wait for and
+    receive the same result (or exception). Blocking callers coordinate through a lock and events,
+    async callers share one task per key on the event loop. Nothing is cached once the call
+    finishes, so results are never staler than an uncoalesced query would be.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tasks: Dict[Hashable, asyncio.Future[Any]] = {}
+        self._executed = 0
+        self._coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self._executed += 1
+            else:
+                self._coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as exc:  # noqa: BLE001
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda finished: self._forget(key, finished))
+            with self._lock:
+                self._executed += 1
+        else:
+            with self._lock:
+                self._coalesced += 1
+        # Shield the shared task so one disconnecting client cannot cancel it for the others.
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, finished: asyncio.Future[Any]) -> None:
+        if self._tasks.get(key) is finished:
+            self._tasks.pop(key, None)
+        if not finished.cancelled():
+            finished.exception()  # mark as retrieved when every waiter went away
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "executed": self._executed,
+                "coalesced": self._coalesced,
+                "in_flight": len(self._calls) + len(self._tasks),
+            }
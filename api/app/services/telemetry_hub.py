@@ -4,7 +4,7 @@ import asyncio
 import threading
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict
+from typing import Dict, Iterable
 from uuid import UUID
 
 from ..core.telemetry import METRIC_DEFINITIONS
@@ -59,6 +59,10 @@ class TelemetryHub:
             cached = self._last.get(device_id)
         return cached
 
+    def get_last_many(self, device_ids: Iterable[UUID]) -> Dict[UUID, TelemetryLastResponse]:
+        with self._lock:
+            return {device_id: self._last[device_id] for device_id in device_ids if device_id in self._last}
+
     def subscribe(self, device_id: UUID) -> asyncio.Queue[TelemetryLastResponse]:
         queue: asyncio.Queue[TelemetryLastResponse] = asyncio.Queue(maxsize=1)
         with self._lock:
@@ -1,12 +1,17 @@
 from __future__ import annotations
 
+import asyncio
+import time
 from datetime import datetime, timezone
 from functools import lru_cache
-from typing import Dict, List
+from typing import Any, Collection, Dict, List
 from uuid import UUID
 
+from aiohttp import ClientError
 from influxdb_client import InfluxDBClient
 from influxdb_client.client.exceptions import InfluxDBError
+from influxdb_client.client.influxdb_client_async import InfluxDBClientAsync
+from influxdb_client.client.query_api_async import QueryApiAsync
 
 from ..core.config import get_settings
 from ..core.telemetry import METRIC_DEFINITIONS
@@ -16,16 +21,106 @@ from ..schemas.telemetry import (
     TelemetryRangePoint,
     TelemetryRangeResponse,
 )
+from .query_profiler import PROFILER_PREAMBLE, QueryProfiler, split_profiler_tables
+from .single_flight import SingleFlight
 
 
 class TelemetryStore:
-    """Thin wrapper for Flux queries against InfluxDB."""
+    """Thin wrapper for Flux queries against InfluxDB.
+
+    The blocking ``fetch_*`` methods remain for synchronous callers. Request handlers should use
+    the ``*_async`` variants, which share one pooled ``InfluxDBClientAsync`` and bound every query
+    with ``influx_query_timeout_sec`` instead of parking a threadpool thread on the round trip.
+
+    Identical queries issued concurrently (same tenant, device, metric, range and interval) are
+    coalesced into a single Flux round trip; see ``query_stats`` for the counters. Every round
+    trip is recorded by ``profiler`` (wall time, Influx-reported execution time, rows, tables).
+    """
 
     def __init__(self) -> None:
         settings = get_settings()
-        self._client = InfluxDBClient(url=settings.influx_url, token=settings.influx_token, org=settings.influx_org)
+        self._url = settings.influx_url
+        self._token = settings.influx_token
+        self._org = settings.influx_org
+        self._timeout_ms = int(settings.influx_query_timeout_sec * 1000)
+        self._query_timeout = settings.influx_query_timeout_sec
+        self._pool_size = settings.influx_pool_size
+        self._profile_server_time = settings.influx_query_profiling
+        self.profiler = QueryProfiler(slow_query_ms=settings.influx_slow_query_ms)
+        self._client = InfluxDBClient(url=self._url, token=self._token, org=self._org, timeout=self._timeout_ms)
         self._query_api = self._client.query_api()
+        self._async_client: InfluxDBClientAsync | None = None
+        self._async_query_api: QueryApiAsync | None = None
         self._bucket = settings.influx_bucket
+        self._flights = SingleFlight()
+
+    def query_stats(self) -> Dict[str, int]:
+        return self._flights.stats()
+
+    def _get_async_query_api(self) -> QueryApiAsync:
+        # The aiohttp session behind InfluxDBClientAsync binds to the running loop, so it is
+        # created lazily from the first request rather than at import time.
+        if self._async_query_api is None:
+            self._async_client = InfluxDBClientAsync(
+                url=self._url,
+                token=self._token,
+                org=self._org,
+                timeout=self._timeout_ms,
+                connection_pool_maxsize=self._pool_size,
+            )
+            self._async_query_api = self._async_client.query_api()
+        return self._async_query_api
+
+    async def aclose(self) -> None:
+        client = self._async_client
+        self._async_client = None
+        self._async_query_api = None
+        if client is not None:
+            await client.close()
+
+    def _prepare(self, flux: str) -> str:
+        # Enabling the Flux query profiler makes Influx append its own execution timings as an
+        # extra result table, which _collect strips off again.
+        return PROFILER_PREAMBLE + flux if self._profile_server_time else flux
+
+    def _collect(self, flux: str, started: float, tables: List[Any] | None) -> List[Any]:
+        server_ms: float | None = None
+        if tables is not None and self._profile_server_time:
+            tables, server_ms = split_profiler_tables(tables)
+        self.profiler.record(
+            flux,
+            wall_ms=(time.perf_counter() - started) * 1000,
+            server_ms=server_ms,
+            rows=sum(len(table.records) for table in tables) if tables else 0,
+            tables=len(tables) if tables else 0,
+            error=tables is None,
+        )
+        return tables or []
+
+    def _query(self, flux: str, error_message: str) -> List[Any]:
+        started = time.perf_counter()
+        tables: List[Any] | None = None
+        try:
+            tables = self._query_api.query(self._prepare(flux))
+        except InfluxDBError as exc:  # noqa: BLE001
+            raise RuntimeError(f"{error_message}: {exc}") from exc
+        finally:
+            tables = self._collect(flux, started, tables)
+        return tables
+
+    async def _query_async(self, flux: str, error_message: str) -> List[Any]:
+        query_api = self._get_async_query_api()
+        started = time.perf_counter()
+        tables: List[Any] | None = None
+        try:
+            tables = await asyncio.wait_for(query_api.query(self._prepare(flux)), timeout=self._query_timeout)
+        except asyncio.TimeoutError as exc:
+            raise RuntimeError(f"{error_message}: timed out after {self._query_timeout}s") from exc
+        except (InfluxDBError, ClientError) as exc:  # noqa: BLE001
+            raise RuntimeError(f"{error_message}: {exc}") from exc
+        finally:
+            tables = self._collect(flux, started, tables)
+        return tables
 
     def _empty_metric_payload(self) -> Dict[str, TelemetryLastMetric]:
         payload: Dict[str, TelemetryLastMetric] = {}
@@ -36,8 +131,9 @@ class TelemetryStore:
     def build_empty_last(self, device_id: UUID) -> TelemetryLastResponse:
         return TelemetryLastResponse(device_id=device_id, timestamp=None, metrics=self._empty_metric_payload())
 
-    def fetch_last(self, tenant_id: UUID, device_id: UUID) -> TelemetryLastResponse | None:
-        flux = f'''
+    # Flux builders ------------------------------------------------------
+    def _last_flux(self, tenant_id: UUID, device_id: UUID) -> str:
+        return f'''
 from(bucket: "{self._bucket}")
   |> range(start: -30d)
   |> filter(fn: (r) => r._measurement == "telemetry")
@@ -46,31 +142,23 @@ from(bucket: "{self._bucket}")
   |> group(columns: ["metric"])
   |> last()
 '''
-        try:
-            tables = self._query_api.query(flux)
-        except InfluxDBError as exc:  # noqa: BLE001
-            raise RuntimeError(f"Telemetry query failed: {exc}") from exc
 
-        latest_at: datetime | None = None
-        metrics = self._empty_metric_payload()
-        if not tables:
-            return None
-
-        for table in tables:
-            for record in table.records:
-                metric_key = record.values.get("metric")
-                value = record.get_value()
-                timestamp = record.get_time()
-                if metric_key in metrics:
-                    metrics[metric_key] = TelemetryLastMetric(unit=metrics[metric_key].unit, value=value)
-                    if latest_at is None or (timestamp and timestamp > latest_at):
-                        latest_at = timestamp
-
-        if latest_at is None:
-            return None
-        return TelemetryLastResponse(device_id=device_id, timestamp=latest_at, metrics=metrics)
+    def _last_many_flux(self, tenant_id: UUID, device_ids: Collection[UUID] | None) -> str:
+        device_filter = ""
+        if device_ids is not None:
+            device_set = ", ".join(f'"{device_id}"' for device_id in sorted(str(item) for item in device_ids))
+            device_filter = f"\n  |> filter(fn: (r) => contains(value: r.device_id, set: [{device_set}]))"
+        return f'''
+from(bucket: "{self._bucket}")
+  |> range(start: -30d)
+  |> filter(fn: (r) => r._measurement == "telemetry")
+  |> filter(fn: (r) => r.tenant_id == "{tenant_id}"){device_filter}
+  |> keep(columns: ["_time", "_value", "device_id", "metric"])
+  |> group(columns: ["device_id", "metric"])
+  |> last()
+'''
 
-    def fetch_range(
+    def _range_flux(
         self,
         tenant_id: UUID,
         device_id: UUID,
@@ -78,10 +166,10 @@ from(bucket: "{self._bucket}")
         start: datetime,
         stop: datetime,
         interval: str,
-    ) -> TelemetryRangeResponse:
+    ) -> str:
         start_iso = start.astimezone(timezone.utc).isoformat()
         stop_iso = stop.astimezone(timezone.utc).isoformat()
-        flux = f'''
+        return f'''
 from(bucket: "{self._bucket}")
   |> range(start: time(v: "{start_iso}"), stop: time(v: "{stop_iso}"))
   |> filter(fn: (r) => r._measurement == "telemetry")
@@ -89,37 +177,22 @@ from(bucket: "{self._bucket}")
   |> aggregateWindow(every: {interval}, fn: mean, createEmpty: false)
   |> keep(columns: ["_time", "_value"])
 '''
-        try:
-            tables = self._query_api.query(flux)
-        except InfluxDBError as exc:  # noqa: BLE001
-            raise RuntimeError(f"Telemetry range query failed: {exc}") from exc
-
-        points: List[TelemetryRangePoint] = []
-        for table in tables:
-            for record in table.records:
-                timestamp = record.get_time()
-                value = record.get_value()
-                if timestamp is None:
-                    continue
-                points.append(TelemetryRangePoint(timestamp=timestamp, value=value))
 
-        return TelemetryRangeResponse(device_id=device_id, metric=metric, interval=interval, points=points)
-
-    def fetch_metric_series(
+    def _series_flux(
         self,
         tenant_id: UUID,
         metric: str,
         start: datetime,
         stop: datetime,
         interval: str,
-        device_id: UUID | None = None,
-    ) -> list[TelemetryRangePoint]:
+        device_id: UUID | None,
+    ) -> str:
         start_iso = start.astimezone(timezone.utc).isoformat()
         stop_iso = stop.astimezone(timezone.utc).isoformat()
         device_filter = ""
         if device_id:
             device_filter = f' and r.device_id == "{device_id}"'
-        flux = f'''
+        return f'''
 from(bucket: "{self._bucket}")
   |> range(start: time(v: "{start_iso}"), stop: time(v: "{stop_iso}"))
   |> filter(fn: (r) => r._measurement == "telemetry")
@@ -127,11 +200,55 @@ from(bucket: "{self._bucket}")
   |> aggregateWindow(every: {interval}, fn: mean, createEmpty: false)
   |> keep(columns: ["_time", "_value"])
 '''
-        try:
-            tables = self._query_api.query(flux)
-        except InfluxDBError as exc:  # noqa: BLE001
-            raise RuntimeError(f"Telemetry series query failed: {exc}") from exc
 
+    # Result parsers -----------------------------------------------------
+    def _parse_last(self, tables: List[Any], device_id: UUID) -> TelemetryLastResponse | None:
+        latest_at: datetime | None = None
+        metrics = self._empty_metric_payload()
+        if not tables:
+            return None
+
+        for table in tables:
+            for record in table.records:
+                metric_key = record.values.get("metric")
+                value = record.get_value()
+                timestamp = record.get_time()
+                if metric_key in metrics:
+                    metrics[metric_key] = TelemetryLastMetric(unit=metrics[metric_key].unit, value=value)
+                    if latest_at is None or (timestamp and timestamp > latest_at):
+                        latest_at = timestamp
+
+        if latest_at is None:
+            return None
+        return TelemetryLastResponse(device_id=device_id, timestamp=latest_at, metrics=metrics)
+
+    def _parse_last_many(self, tables: List[Any]) -> Dict[UUID, TelemetryLastResponse]:
+        results: Dict[UUID, TelemetryLastResponse] = {}
+        for table in tables:
+            for record in table.records:
+                metric_key = record.values.get("metric")
+                raw_device_id = record.values.get("device_id")
+                timestamp = record.get_time()
+                if not raw_device_id or timestamp is None:
+                    continue
+                try:
+                    device_id = UUID(raw_device_id)
+                except ValueError:
+                    continue
+                entry = results.get(device_id)
+                if entry is None:
+                    entry = TelemetryLastResponse(device_id=device_id, timestamp=timestamp, metrics=self._empty_metric_payload())
+                    results[device_id] = entry
+                if metric_key in entry.metrics:
+                    entry.metrics[metric_key] = TelemetryLastMetric(
+                        unit=entry.metrics[metric_key].unit,
+                        value=record.get_value(),
+                    )
+                    if timestamp > entry.timestamp:
+                        entry.timestamp = timestamp
+        return results
+
+    def _parse_points(self, tables: List[Any]) -> List[TelemetryRangePoint]:
         points: List[TelemetryRangePoint] = []
         for table in tables:
             for record in table.records:
@@ -142,6 +259,107 @@ from(bucket: "{self._bucket}")
                 points.append(TelemetryRangePoint(timestamp=timestamp, value=value))
         return points
 
+    # Blocking API -------------------------------------------------------
+    def fetch_last(self, tenant_id: UUID, device_id: UUID) -> TelemetryLastResponse | None:
+        def run() -> TelemetryLastResponse | None:
+            tables = self._query(self._last_flux(tenant_id, device_id), "Telemetry query failed")
+            return self._parse_last(tables, device_id)
+
+        return self._flights.do(("last", tenant_id, device_id), run)
+
+    def fetch_range(
+        self,
+        tenant_id: UUID,
+        device_id: UUID,
+        metric: str,
+        start: datetime,
+        stop: datetime,
+        interval: str,
+    ) -> TelemetryRangeResponse:
+        def run() -> TelemetryRangeResponse:
+            flux = self._range_flux(tenant_id, device_id, metric, start, stop, interval)
+            tables = self._query(flux, "Telemetry range query failed")
+            points = self._parse_points(tables)
+            return TelemetryRangeResponse(device_id=device_id, metric=metric, interval=interval, points=points)
+
+        return self._flights.do(("range", tenant_id, device_id, metric, start, stop, interval), run)
+
+    def fetch_metric_series(
+        self,
+        tenant_id: UUID,
+        metric: str,
+        start: datetime,
+        stop: datetime,
+        interval: str,
+        device_id: UUID | None = None,
+    ) -> list[TelemetryRangePoint]:
+        def run() -> list[TelemetryRangePoint]:
+            flux = self._series_flux(tenant_id, metric, start, stop, interval, device_id)
+            tables = self._query(flux, "Telemetry series query failed")
+            return self._parse_points(tables)
+
+        return self._flights.do(("series", tenant_id, device_id, metric, start, stop, interval), run)
+
+    # Async API ----------------------------------------------------------
+    async def fetch_last_async(self, tenant_id: UUID, device_id: UUID) -> TelemetryLastResponse | None:
+        async def run() -> TelemetryLastResponse | None:
+            tables = await self._query_async(self._last_flux(tenant_id, device_id), "Telemetry query failed")
+            return self._parse_last(tables, device_id)
+
+        return await self._flights.do_async(("last", tenant_id, device_id), run)
+
+    async def fetch_last_many_async(
+        self,
+        tenant_id: UUID,
+        device_ids: Collection[UUID] | None = None,
+    ) -> Dict[UUID, TelemetryLastResponse]:
+        """Latest metrics for many devices in one grouped Flux query.
+
+        ``device_ids=None`` covers every device of the tenant. Devices without telemetry in the
+        last 30 days are absent from the result.
+        """
+
+        async def run() -> Dict[UUID, TelemetryLastResponse]:
+            flux = self._last_many_flux(tenant_id, device_ids)
+            tables = await self._query_async(flux, "Telemetry batch query failed")
+            return self._parse_last_many(tables)
+
+        key_ids = frozenset(device_ids) if device_ids is not None else None
+        return await self._flights.do_async(("last_many", tenant_id, key_ids), run)
+
+    async def fetch_range_async(
+        self,
+        tenant_id: UUID,
+        device_id: UUID,
+        metric: str,
+        start: datetime,
+        stop: datetime,
+        interval: str,
+    ) -> TelemetryRangeResponse:
+        async def run() -> TelemetryRangeResponse:
+            flux = self._range_flux(tenant_id, device_id, metric, start, stop, interval)
+            tables = await self._query_async(flux, "Telemetry range query failed")
+            points = self._parse_points(tables)
+            return TelemetryRangeResponse(device_id=device_id, metric=metric, interval=interval, points=points)
+
+        return await self._flights.do_async(("range", tenant_id, device_id, metric, start, stop, interval), run)
+
+    async def fetch_metric_series_async(
+        self,
+        tenant_id: UUID,
+        metric: str,
+        start: datetime,
+        stop: datetime,
+        interval: str,
+        device_id: UUID | None = None,
+    ) -> list[TelemetryRangePoint]:
+        async def run() -> list[TelemetryRangePoint]:
+            flux = self._series_flux(tenant_id, metric, start, stop, interval, device_id)
+            tables = await self._query_async(flux, "Telemetry series query failed")
+            return self._parse_points(tables)
+
+        return await self._flights.do_async(("series", tenant_id, device_id, metric, start, stop, interval), run)
+
 
 @lru_cache()
 def get_telemetry_store() -> TelemetryStore:
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import hashlib
+import secrets
+import threading
+from typing import Dict, Hashable, Iterable, Tuple
+from uuid import UUID
+
+from fastapi import Request, Response, status
+
+DEVICES = "devices"
+ALERTS = "alerts"
+TELEMETRY = "telemetry"
+
+
+class TenantVersions:
+    """Per-tenant change counters used to derive ETags for polled endpoints.
+
+    Writers bump the scopes they touch after committing; readers build an ETag from the scopes
+    their response depends on *before* querying, so a change racing the query yields a stale tag
+    and the next poll refetches rather than the other way round. Counters live in process memory
+    and are salted with a per-boot nonce, so a restart invalidates every outstanding tag.
+    """
+
+    def __init__(self) -> None:
+        self._nonce = secrets.token_hex(8)
+        self._versions: Dict[Tuple[UUID, str], int] = {}
+        self._lock = threading.Lock()
+
+    def bump(self, tenant_id: UUID, *scopes: str) -> None:
+        with self._lock:
+            for scope in scopes:
+                key = (tenant_id, scope)
+                self._versions[key] = self._versions.get(key, 0) + 1
+
+    def get(self, tenant_id: UUID, scope: str) -> int:
+        with self._lock:
+            return self._versions.get((tenant_id, scope), 0)
+
+    def etag(self, tenant_id: UUID, scopes: Iterable[str], *extra: Hashable) -> str:
+        with self._lock:
+            versions = [(scope, self._versions.get((tenant_id, scope), 0)) for scope in scopes]
+        material = repr((self._nonce, str(tenant_id), versions, extra)).encode()
+        return f'W/"{hashlib.blake2s(material, digest_size=12).hexdigest()}"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+
+def conditional_get(
+    request: Request,
+    response: Response,
+    tenant_id: UUID,
+    scopes: Iterable[str],
+    *extra: Hashable,
+) -> Response | None:
+    """Tag ``response`` and return a bare 304 when the client already holds the current version."""
+
+    etag = tenant_versions.etag(tenant_id, scopes, request.url.query, *extra)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+tenant_versions = TenantVersions()
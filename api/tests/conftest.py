@@ -0,0 +1,127 @@
+"""Shared fixtures.
+
+Database tests run against the Postgres named by ``TEST_DATABASE_URL`` (migrated to head once per
+session, every table but ``tenants`` truncated before each test) and are skipped without it.
+The database is scratch space: do not point it at anything you want to keep.
+"""
+from __future__ import annotations
+
+import os
+import subprocess
+from pathlib import Path
+
+import pytest
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+os.environ.setdefault("DATABASE_URL", "postgresql+psycopg2://postgres@localhost/iot_portal_test")
+os.environ.setdefault("JWT_SECRET", "test-secret")
+
+API_ROOT = Path(__file__).resolve().parents[1]
+_TABLES = ("alerts_archive", "alert_counters", "alert_daily_counts", "alerts", "thresholds", "devices", "users")
+
+
+@pytest.fixture(scope="session")
+def migrated_db() -> None:
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    subprocess.run(["alembic", "upgrade", "head"], cwd=API_ROOT, check=True, env=os.environ.copy(), capture_output=True)
+
+
+@pytest.fixture
+def db_session(migrated_db):
+    from sqlalchemy import text
+
+    from app.db.session import SessionLocal
+    from app.routes import alerts as alert_routes
+    from app.services.dashboard_state import dashboard_state
+
+    db = SessionLocal()
+    db.execute(text(f"TRUNCATE {', '.join(_TABLES)} CASCADE"))
+    db.commit()
+    with dashboard_state._lock:
+        dashboard_state._tenants.clear()
+    with alert_routes._summary_cache_lock:
+        alert_routes._summary_cache.clear()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def client(db_session):
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    # Not entered as a context manager: the startup hooks (Influx, background jobs) stay off.
+    return TestClient(app)
+
+
+@pytest.fixture
+def auth_headers(client):
+    response = client.post("/auth/register", json={"email": "owner@example.com", "password": "Password123!"})
+    assert response.status_code == 201, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def tenant_id(auth_headers, db_session):
+    from app.db.models import User
+
+    return db_session.query(User.tenant_id).scalar()
+
+
+@pytest.fixture
+def device(client, auth_headers):
+    response = client.post("/devices", json={"name": "Boiler room"}, headers=auth_headers)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+@pytest.fixture
+def evaluate(client, tenant_id):
+    """Post one worker evaluation for ``device`` and return the ingest response body."""
+
+    def post(device_id, metric_key="temp_c", breached=True, severity="critical", value=80.0):
+        item = {
+            "tenant_id": str(tenant_id),
+            "device_id": str(device_id),
+            "metric_key": metric_key,
+            "breached": breached,
+            "severity": severity,
+            "value": value,
+            "message": f"{metric_key} {value}",
+        }
+        response = client.post("/internal/alerts/evaluations", json={"items": [item]})
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    return post
+
+
+@pytest.fixture
+def alert_counts(db_session):
+    """``(stored, actual)`` per (status, severity): alert_counters against a recount of alerts."""
+
+    from sqlalchemy import text
+
+    def read():
+        db_session.rollback()
+        stored = {
+            (status, severity): count
+            for status, severity, count in db_session.execute(text("SELECT status, severity, count FROM alert_counters"))
+            if count
+        }
+        actual = {
+            (status, severity): count
+            for status, severity, count in db_session.execute(
+                text("SELECT status, severity, count(*) FROM alerts GROUP BY status, severity")
+            )
+        }
+        db_session.rollback()
+        return stored, actual
+
+    return read
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import asyncio
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import text
+
+from app.routes.dashboard import load_dashboard_snapshot
+from app.services.dashboard_state import dashboard_state
+from app.services.monitoring_changes import monitoring_changes
+
+
+@pytest.fixture
+def other_device(client, auth_headers):
+    response = client.post("/devices", json={"name": "Roof unit"}, headers=auth_headers)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def _statuses(db_session):
+    db_session.rollback()
+    rows = db_session.execute(text("SELECT device_id, status FROM alerts")).all()
+    db_session.rollback()
+    return {str(device_id): status for device_id, status in rows}
+
+
+@pytest.mark.parametrize(
+    "criteria",
+    [
+        {},
+        {"status": None},
+        {"device_id": None, "metric_key": None, "status": None, "created_before": None},
+    ],
+)
+def test_filter_without_criteria_is_rejected(client, auth_headers, db_session, device, evaluate, criteria):
+    evaluate(device["id"])
+
+    response = client.post("/alerts/bulk", json={"action": "resolve", "filter": criteria}, headers=auth_headers)
+
+    assert response.status_code == 400
+    assert response.json()["error"]["message"] == "Filter needs at least one criterion"
+    assert _statuses(db_session) == {device["id"]: "open"}
+
+
+def test_partially_null_filter_applies_only_the_set_criteria(client, auth_headers, db_session, device, other_device, evaluate):
+    evaluate(device["id"])
+    evaluate(other_device["id"])
+
+    response = client.post(
+        "/alerts/bulk",
+        json={"action": "resolve", "filter": {"device_id": device["id"], "status": None, "metric_key": None}},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 200
+    assert response.json()["updated"] == 1
+    assert _statuses(db_session) == {device["id"]: "resolved", other_device["id"]: "open"}
+
+
+def test_ids_and_filter_are_mutually_exclusive(client, auth_headers, device):
+    response = client.post(
+        "/alerts/bulk",
+        json={"action": "ack", "ids": [str(uuid.uuid4())], "filter": {"device_id": device["id"]}},
+        headers=auth_headers,
+    )
+    assert response.status_code == 400
+
+
+def test_id_list_is_capped_at_ten_thousand(client, auth_headers, db_session):
+    too_many = [str(uuid.uuid4()) for _ in range(10_001)]
+    response = client.post("/alerts/bulk", json={"action": "ack", "ids": too_many}, headers=auth_headers)
+    assert response.status_code == 422
+
+    response = client.post("/alerts/bulk", json={"action": "ack", "ids": too_many[:10_000]}, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json() == {"action": "ack", "updated": 0, "skipped": 10_000}
+
+
+def test_bulk_resolve_moves_counters_rollup_dashboard_and_change_log(
+    client, auth_headers, db_session, tenant_id, device, other_device, evaluate, alert_counts
+):
+    evaluate(device["id"])
+    evaluate(other_device["id"])
+    client.post(
+        "/alerts/bulk", json={"action": "ack", "filter": {"device_id": other_device["id"]}}, headers=auth_headers
+    )
+    dashboard_state.install(tenant_id, asyncio.run(load_dashboard_snapshot(tenant_id)))
+    assert dashboard_state.read(tenant_id).active_alerts == 2
+    cursor = monitoring_changes.current()
+
+    response = client.post("/alerts/bulk", json={"action": "resolve", "filter": {"metric_key": "temp_c"}}, headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.json()["updated"] == 2
+    stored, actual = alert_counts()
+    assert actual == {("resolved", "critical"): 2}
+    assert stored == actual
+    today = datetime.now(timezone.utc).date()
+    resolved = db_session.execute(
+        text("SELECT resolved FROM alert_daily_counts WHERE tenant_id = :tenant AND day = :day"),
+        {"tenant": tenant_id, "day": today},
+    ).scalar()
+    assert resolved == 2
+    counts = dashboard_state.read(tenant_id)
+    assert counts.active_alerts == 0
+    assert counts.resolved_today == 2
+    changes = monitoring_changes.since(cursor)
+    assert changes.alerts == {
+        (uuid.UUID(device["id"]), "temp_c"),
+        (uuid.UUID(other_device["id"]), "temp_c"),
+    }
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event, text
+
+from app.db.session import SessionLocal
+from app.services import alert_counters
+from app.services.alert_archive import archive_resolved_alerts
+
+ACTIONS = {
+    "ack": lambda client, headers, alert_id: client.post(f"/alerts/{alert_id}/ack", headers=headers),
+    "resolve": lambda client, headers, alert_id: client.post(f"/alerts/{alert_id}/resolve", headers=headers),
+    "bulk_ack": lambda client, headers, alert_id: client.post(
+        "/alerts/bulk", json={"action": "ack", "ids": [alert_id]}, headers=headers
+    ),
+    "bulk_resolve": lambda client, headers, alert_id: client.post(
+        "/alerts/bulk", json={"action": "resolve", "ids": [alert_id]}, headers=headers
+    ),
+}
+
+
+def _alert_id(db_session) -> str:
+    db_session.rollback()
+    alert_id = db_session.execute(text("SELECT id FROM alerts")).scalar_one()
+    db_session.rollback()
+    return str(alert_id)
+
+
+def _wait_for_lock_waiters(count: int, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    probe = SessionLocal()
+    try:
+        while time.monotonic() < deadline:
+            waiting = probe.execute(
+                text("SELECT count(*) FROM pg_stat_activity WHERE datname = current_database() AND wait_event_type = 'Lock'")
+            ).scalar()
+            probe.rollback()
+            if waiting >= count:
+                return
+            time.sleep(0.05)
+    finally:
+        probe.close()
+    pytest.fail(f"expected {count} requests blocked on the alert row")
+
+
+@pytest.mark.parametrize(
+    ("first", "second", "final"),
+    [
+        ("ack", "bulk_resolve", "resolved"),
+        ("bulk_ack", "resolve", "resolved"),
+        ("resolve", "bulk_resolve", "resolved"),
+        ("ack", "bulk_ack", "acked"),
+    ],
+)
+def test_racing_updates_of_one_alert_are_counted_once(client, auth_headers, db_session, device, evaluate, alert_counts, first, second, final):
+    evaluate(device["id"])
+    alert_id = _alert_id(db_session)
+
+    # Hold the row so both requests queue on it, then let them race for it.
+    blocker = SessionLocal()
+    blocker.execute(text("SELECT id FROM alerts WHERE id = :id FOR UPDATE"), {"id": alert_id})
+    threads = [
+        threading.Thread(target=ACTIONS[action], args=(client, auth_headers, alert_id)) for action in (first, second)
+    ]
+    for thread in threads:
+        thread.start()
+    _wait_for_lock_waiters(2)
+    blocker.commit()
+    blocker.close()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    stored, actual = alert_counts()
+    assert actual == {(final, "critical"): 1}
+    assert stored == actual
+
+
+def test_refresh_with_new_severity_moves_the_counter(device, evaluate, alert_counts):
+    evaluate(device["id"], severity="warning")
+    assert evaluate(device["id"], severity="critical")["updated"] == 1
+
+    stored, actual = alert_counts()
+    assert actual == {("open", "critical"): 1}
+    assert stored == actual
+
+
+def test_archiving_decrements_resolved(client, auth_headers, db_session, device, evaluate, alert_counts):
+    evaluate(device["id"])
+    evaluate(device["id"], breached=False, value=20.0)
+    db_session.execute(text("UPDATE alerts SET resolved_at = :at"), {"at": datetime.now(timezone.utc) - timedelta(days=10)})
+    db_session.commit()
+    assert alert_counts()[0] == {("resolved", "critical"): 1}
+
+    assert archive_resolved_alerts(retention_days=1, batch_size=100) == 1
+
+    stored, actual = alert_counts()
+    assert stored == actual == {}
+    assert db_session.execute(text("SELECT count(*) FROM alerts_archive")).scalar() == 1
+
+
+def test_repair_corrects_drift(db_session, device, evaluate, alert_counts):
+    evaluate(device["id"])
+    evaluate(device["id"], metric_key="humidity_pct")
+    db_session.execute(text("DELETE FROM alert_counters"))
+    db_session.execute(
+        text("INSERT INTO alert_counters (tenant_id, status, severity, count) SELECT id, 'acked', 'warning', 3 FROM tenants")
+    )
+    db_session.commit()
+
+    assert alert_counters.repair_alert_counters() == 2
+
+    stored, actual = alert_counts()
+    assert actual == {("open", "critical"): 2}
+    assert stored == actual
+    assert alert_counters.repair_alert_counters() == 0
+
+
+def test_repair_skips_counters_that_move_while_it_runs(monkeypatch, db_session, device, evaluate, alert_counts):
+    evaluate(device["id"])
+    db_session.execute(text("UPDATE alert_counters SET count = 5 WHERE status = 'open'"))
+    db_session.commit()
+
+    session_factory = alert_counters.SessionLocal
+
+    def session_with_racing_writer():
+        session = session_factory()
+
+        # Runs right after the repair's read snapshot commits, before any compare-and-set.
+        @event.listens_for(session, "after_commit", once=True)
+        def open_another_alert(_session):
+            evaluate(device["id"], metric_key="humidity_pct")
+
+        return session
+
+    monkeypatch.setattr(alert_counters, "SessionLocal", session_with_racing_writer)
+    assert alert_counters.repair_alert_counters() == 0
+    stored, actual = alert_counts()
+    # The writer's +1 landed on the drifted count, which the repair then left alone.
+    assert stored == {("open", "critical"): 6}
+    assert actual == {("open", "critical"): 2}
+
+    monkeypatch.undo()
+    assert alert_counters.repair_alert_counters() == 1
+    stored, actual = alert_counts()
+    assert stored == actual
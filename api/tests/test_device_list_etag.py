@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.routes import devices as device_routes
+
+
+@pytest.fixture
+def frozen_minute(monkeypatch):
+    """Pins the clock the device list tag rolls over on; returns a callable that advances it."""
+
+    now = [datetime(2026, 10, 19, 12, 0, 10, tzinfo=timezone.utc)]
+
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now[0]
+
+    monkeypatch.setattr(device_routes, "datetime", FrozenDatetime)
+
+    def advance(delta: timedelta) -> None:
+        now[0] += delta
+
+    return advance
+
+
+def _list(client, headers, etag=None):
+    extra = {"If-None-Match": etag} if etag else {}
+    return client.get("/devices", headers={**headers, **extra})
+
+
+def test_ingest_does_not_invalidate_the_device_list_within_a_minute(client, auth_headers, device, frozen_minute):
+    etag = _list(client, auth_headers).headers["ETag"]
+
+    response = client.post(
+        "/internal/telemetry_ingest", json={"device_id": device["id"], "metrics": {"temp_c": 21.5}}
+    )
+    assert response.status_code == 200, response.text
+
+    assert _list(client, auth_headers, etag).status_code == 304
+    frozen_minute(timedelta(minutes=1))
+    assert _list(client, auth_headers, etag).status_code == 200
+
+
+def test_device_changes_invalidate_the_device_list(client, auth_headers, device, frozen_minute):
+    etag = _list(client, auth_headers).headers["ETag"]
+
+    response = client.post("/devices", json={"name": "Second"}, headers=auth_headers)
+    assert response.status_code == 201
+
+    refreshed = _list(client, auth_headers, etag)
+    assert refreshed.status_code == 200
+    assert len(refreshed.json()["items"]) == 2
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import math
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.schemas.telemetry import TelemetryRangePoint
+from app.services.downsampling import lttb
+
+START = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+
+def _series(values):
+    return [TelemetryRangePoint(timestamp=START + timedelta(minutes=index), value=value) for index, value in enumerate(values)]
+
+
+def _wave(count, offset=0):
+    return [math.sin((index + offset) / 20) * 10 for index in range(count)]
+
+
+@pytest.mark.parametrize("max_points", [3, 4, 50, 999])
+def test_first_and_last_points_are_kept_within_the_bound(max_points):
+    points = _series(_wave(1000))
+
+    sampled = lttb(points, max_points)
+
+    assert len(sampled) == max_points
+    assert sampled[0] == points[0]
+    assert sampled[-1] == points[-1]
+    assert [point.timestamp for point in sampled] == sorted(point.timestamp for point in sampled)
+
+
+def test_extremes_survive():
+    values = _wave(2000)
+    values[700] = 500.0
+    values[1500] = -500.0
+
+    sampled = lttb(_series(values), 40)
+
+    kept = [point.value for point in sampled]
+    assert 500.0 in kept
+    assert -500.0 in kept
+
+
+def test_short_series_is_returned_unchanged():
+    points = _series([1.0, None, 3.0])
+    assert lttb(points, 3) == points
+
+
+def test_gap_is_kept_as_a_marker():
+    values = _wave(500) + [None] * 200 + _wave(300, offset=700)
+    points = _series(values)
+
+    sampled = lttb(points, 100)
+
+    assert len(sampled) <= 100
+    markers = [index for index, point in enumerate(sampled) if point.value is None]
+    assert len(markers) == 1
+    marker = sampled[markers[0]]
+    assert marker == points[500]
+    # Both runs keep their edges, so the line stops and restarts where the raw data does.
+    assert sampled[markers[0] - 1] == points[499]
+    assert sampled[markers[0] + 1] == points[700]
+    # The budget is split by run length.
+    assert markers[0] > len(sampled) - markers[0]
+
+
+def test_leading_and_trailing_gaps_are_dropped():
+    points = _series([None] * 50 + _wave(500) + [None] * 50)
+
+    sampled = lttb(points, 20)
+
+    assert len(sampled) == 20
+    assert sampled[0] == points[50]
+    assert sampled[-1] == points[549]
+
+
+def test_all_missing_values_give_an_empty_series():
+    assert lttb(_series([None] * 10), 5) == []
+
+
+def test_many_gaps_stay_within_the_bound_and_keep_the_widest():
+    rng = random.Random(7)
+    values = []
+    for index in range(200):
+        values.extend(rng.uniform(0, 10) for _ in range(rng.randint(1, 5)))
+        if index == 120:
+            widest_at = len(values)
+        values.extend([None] * (50 if index == 120 else 1))
+    values.append(1.0)
+    points = _series(values)
+    widest = points[widest_at]
+
+    for max_points in (3, 5, 11, 60, 301):
+        sampled = lttb(points, max_points)
+        assert len(sampled) == max_points
+        assert sampled[0] == points[0]
+        assert sampled[-1] == points[-1]
+        markers = [point for point in sampled if point.value is None]
+        assert len(markers) == (max_points - 3) // 2
+        if markers:
+            assert widest in markers
+        assert all(a.value is not None or b.value is not None for a, b in zip(sampled, sampled[1:]))
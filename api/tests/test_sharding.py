@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import uuid
+
+import pytest
+from sqlalchemy import text
+
+from app.services.sharding import device_shard, jump_hash
+
+
+def test_jump_hash_moves_about_one_in_n_keys_when_growing():
+    keys = [uuid.uuid4().int for _ in range(20_000)]
+    moved = sum(jump_hash(key, 4) != jump_hash(key, 5) for key in keys)
+    assert 0.17 < moved / len(keys) < 0.23
+    # Keys only ever move to the new bucket.
+    assert all(jump_hash(key, 5) in (jump_hash(key, 4), 4) for key in keys)
+
+
+def test_sql_device_shard_matches_python(db_session):
+    device_ids = [uuid.uuid4() for _ in range(2_000)] + [uuid.UUID(int=0), uuid.UUID(int=(1 << 128) - 1)]
+    for shard_count in (1, 2, 3, 7, 64, 1_000):
+        rows = db_session.execute(
+            text("SELECT id, device_shard(id, :count) FROM unnest(CAST(:ids AS uuid[])) AS id"),
+            {"ids": [str(device_id) for device_id in device_ids], "count": shard_count},
+        )
+        mismatched = [(device_id, shard) for device_id, shard in rows if shard != device_shard(device_id, shard_count)]
+        assert mismatched == [], shard_count
+
+
+@pytest.mark.parametrize("shard_count", [1, 3])
+def test_full_sharded_snapshots_partition_devices_and_alerts(client, auth_headers, evaluate, shard_count):
+    device_ids = []
+    for index in range(12):
+        device = client.post("/devices", json={"name": f"Sensor {index}"}, headers=auth_headers).json()
+        response = client.put(
+            f"/devices/{device['id']}/thresholds",
+            json={"items": [{"metric_key": "temp_c", "max_value": 50}]},
+            headers=auth_headers,
+        )
+        assert response.status_code == 200, response.text
+        evaluate(device["id"])
+        device_ids.append(uuid.UUID(device["id"]))
+
+    seen_devices, seen_alerts = [], []
+    for shard_index in range(shard_count):
+        response = client.get(
+            "/internal/monitoring/snapshot", params={"shard_index": shard_index, "shard_count": shard_count}
+        )
+        assert response.status_code == 200, response.text
+        body = response.json()
+        shard_devices = [uuid.UUID(item["device_id"]) for item in body["devices"]]
+        shard_alerts = [uuid.UUID(item["device_id"]) for item in body["active_alerts"]]
+        assert all(device_shard(device_id, shard_count) == shard_index for device_id in shard_devices + shard_alerts)
+        seen_devices += shard_devices
+        seen_alerts += shard_alerts
+
+    assert sorted(seen_devices) == sorted(device_ids)
+    assert sorted(seen_alerts) == sorted(device_ids)
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+from app.routes import devices as device_routes
+from app.services.telemetry_hub import TelemetrySample, telemetry_hub
+
+
+@pytest.fixture
+def fleet(client, auth_headers):
+    ids = []
+    for index in range(4):
+        response = client.post("/devices", json={"name": f"Meter {index}"}, headers=auth_headers)
+        assert response.status_code == 201, response.text
+        ids.append(uuid.UUID(response.json()["id"]))
+    # One device is warm in the in-process cache.
+    telemetry_hub.update(TelemetrySample(device_id=ids[0], timestamp=datetime.now(timezone.utc), metrics={"temp_c": 21.0}))
+    return ids
+
+
+@pytest.fixture
+def fetch_scopes(monkeypatch):
+    scopes = []
+
+    async def fetch_last_many_async(tenant_id, device_ids):
+        scopes.append(None if device_ids is None else sorted(device_ids))
+        return {}
+
+    monkeypatch.setattr(device_routes.telemetry_store, "fetch_last_many_async", fetch_last_many_async)
+    return scopes
+
+
+def test_tenant_wide_request_ships_a_small_miss_set(client, auth_headers, fleet, fetch_scopes):
+    response = client.get("/devices/telemetry/last", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert fetch_scopes == [sorted(fleet[1:])]
+
+
+def test_tenant_wide_request_falls_back_to_tenant_scope_past_the_batch_cap(
+    monkeypatch, client, auth_headers, fleet, fetch_scopes
+):
+    monkeypatch.setattr(device_routes, "MAX_BATCH_DEVICES", 2)
+
+    response = client.get("/devices/telemetry/last", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert fetch_scopes == [None]
+    assert len(response.json()["items"]) == 4
@@ -56,7 +56,8 @@ export type AlertSummary = {
 
 export type AlertListResponse = {
   items: AlertResponse[];
-  summary: AlertSummary;
+  summary: AlertSummary | null;
+  next_cursor: string | null;
 };
 
 export type DashboardTelemetryPoint = {
@@ -0,0 +1,104 @@
+"""Benchmark the vectorized threshold engine and check it against the scalar evaluation.
+
+    python bench_engine.py [--rows 1000000] [--cycles 5] [--check 20000]
+
+Builds ``rows`` thresholds (five metrics per device), then runs ``cycles`` evaluation cycles with
+random telemetry (including missing samples), timing each phase. Every cycle, ``check`` random
+rows are replayed through ``WorkerService._determine_state`` and must agree on state and
+direction. Not part of the worker image.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+import uuid
+from typing import Dict
+from uuid import UUID
+
+import numpy as np
+
+from engine import DIRECTION_CODES, DIRECTION_NAMES, ThresholdEngine
+from main import METRIC_DEFINITIONS, DeviceSnapshot, ThresholdConfig, WorkerService
+
+
+def build_devices(rows: int, rng: random.Random) -> list[DeviceSnapshot]:
+    metrics = list(METRIC_DEFINITIONS)
+    tenant_id = uuid.uuid4()
+    devices = []
+    for _ in range(rows // len(metrics)):
+        thresholds = []
+        for metric_key in metrics:
+            low = rng.choice([None, rng.uniform(0, 20)])
+            high = rng.choice([None, rng.uniform(60, 80)]) if low is not None else rng.uniform(60, 80)
+            thresholds.append(
+                ThresholdConfig.model_construct(
+                    metric_key=metric_key,
+                    min_value=low,
+                    max_value=high,
+                    hysteresis=rng.choice([None, 0.0, 2.0, 5.0]),
+                    enabled=True,
+                )
+            )
+        devices.append(DeviceSnapshot.model_construct(device_id=uuid.uuid4(), tenant_id=tenant_id, name="bench", thresholds=thresholds))
+    return devices
+
+
+def random_latest(engine: ThresholdEngine, rng: np.random.Generator) -> Dict[UUID, Dict[str, float]]:
+    values = rng.uniform(-10, 90, len(engine))
+    present = rng.random(len(engine)) > 0.05
+    latest: Dict[UUID, Dict[str, float]] = {}
+    for (device_id, metric_key), value, keep in zip(engine.keys, values.tolist(), present.tolist()):
+        if keep:
+            latest.setdefault(device_id, {})[metric_key] = value
+    return latest
+
+
+def check(engine: ThresholdEngine, before_breached, before_direction, values, rows) -> None:
+    scalar = WorkerService._determine_state
+    for row in rows:
+        value = None if np.isnan(values[row]) else float(values[row])
+        was = bool(before_breached[row])
+        previous = DIRECTION_NAMES[int(before_direction[row])]
+        state, direction = scalar(None, value, engine.thresholds[row], was, previous)
+        if state is None:
+            state, direction = was, previous
+        expected = (state, DIRECTION_CODES[direction] if state else 0)
+        actual = (bool(engine.breached[row]), int(engine.direction[row]) if engine.breached[row] else 0)
+        assert expected == actual, (row, value, was, previous, engine.thresholds[row], expected, actual)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--cycles", type=int, default=5)
+    parser.add_argument("--check", type=int, default=20_000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    np_rng = np.random.default_rng(7)
+
+    started = time.perf_counter()
+    devices = build_devices(args.rows, rng)
+    engine = ThresholdEngine(devices)
+    print(f"build: {len(engine):,} rows in {time.perf_counter() - started:.2f}s")
+
+    for cycle in range(args.cycles):
+        latest = random_latest(engine, np_rng)
+
+        started = time.perf_counter()
+        values = engine.gather(latest)
+        gathered = time.perf_counter()
+        before_breached, before_direction = engine.breached.copy(), engine.direction.copy()
+        result = engine.evaluate(values)
+        evaluated = time.perf_counter()
+
+        check(engine, before_breached, before_direction, values, np_rng.choice(len(engine), size=args.check, replace=False))
+        print(
+            f"cycle {cycle}: gather {1000 * (gathered - started):.0f}ms, evaluate {1000 * (evaluated - gathered):.0f}ms, "
+            f"{int(result.transition.sum()):,} transitions, {len(result.rows):,} rows reported"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Vectorized threshold evaluation.
+
+Keeps every monitored (device, metric) pair as a row of aligned NumPy arrays so one evaluation
+cycle is a handful of array comparisons instead of a Python loop over devices and thresholds.
+The semantics mirror ``WorkerService._determine_state`` exactly.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Iterable, List, Mapping, Optional, Tuple
+from uuid import UUID
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from main import DeviceSnapshot, ThresholdConfig
+
+Key = Tuple[UUID, str]
+
+NO_DIRECTION = 0
+HIGH = 1
+LOW = 2
+DIRECTION_CODES: Dict[Optional[str], int] = {None: NO_DIRECTION, "high": HIGH, "low": LOW}
+DIRECTION_NAMES: Dict[int, Optional[str]] = {code: name for name, code in DIRECTION_CODES.items()}
+
+
+@dataclass(frozen=True)
+class EngineResult:
+    """Candidate rows to report: every state transition plus alerts that stay breached."""
+
+    rows: np.ndarray
+    breached: np.ndarray
+    direction: np.ndarray
+    transition: np.ndarray
+
+
+class ThresholdEngine:
+    """Aligned threshold and state arrays over all monitored (device, metric) pairs.
+
+    Only enabled thresholds with at least one bound get a row; the scalar path skips the others
+    as well. ``min_value``/``max_value`` are NaN where unset and ``hysteresis`` is 0.
+    """
+
+    def __init__(self, devices: Iterable["DeviceSnapshot"]) -> None:
+        self.keys: List[Key] = []
+        self.tenant_ids: List[UUID] = []
+        self.thresholds: List["ThresholdConfig"] = []
+        mins: List[float] = []
+        maxs: List[float] = []
+        hysteresis: List[float] = []
+        for device in devices:
+            for threshold in device.thresholds:
+                if not threshold.enabled:
+                    continue
+                if threshold.min_value is None and threshold.max_value is None:
+                    continue
+                self.keys.append((device.device_id, threshold.metric_key))
+                self.tenant_ids.append(device.tenant_id)
+                self.thresholds.append(threshold)
+                mins.append(np.nan if threshold.min_value is None else threshold.min_value)
+                maxs.append(np.nan if threshold.max_value is None else threshold.max_value)
+                hysteresis.append(threshold.hysteresis or 0.0)
+
+        self.index: Dict[Key, int] = {key: row for row, key in enumerate(self.keys)}
+        # Rows whose rule compares a window aggregate; the worker substitutes it before evaluate().
+        self.windowed_rows: List[int] = [row for row, threshold in enumerate(self.thresholds) if threshold.windowed]
+        self.min_value = np.array(mins, dtype=np.float64)
+        self.max_value = np.array(maxs, dtype=np.float64)
+        self.hysteresis = np.array(hysteresis, dtype=np.float64)
+        self.breached = np.zeros(len(self.keys), dtype=bool)
+        self.direction = np.zeros(len(self.keys), dtype=np.int8)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def load_state(self, active: Iterable[Key], directions: Mapping[Key, Optional[str]]) -> None:
+        self.breached.fill(False)
+        self.direction.fill(NO_DIRECTION)
+        for key in active:
+            row = self.index.get(key)
+            if row is not None:
+                self.breached[row] = True
+                self.direction[row] = DIRECTION_CODES.get(directions.get(key), NO_DIRECTION)
+
+    def gather(self, latest: Mapping[UUID, Mapping[str, float]]) -> np.ndarray:
+        """Latest values aligned to the rows; NaN where the pair has no sample."""
+
+        values = np.full(len(self.keys), np.nan, dtype=np.float64)
+        index = self.index
+        for device_id, metrics in latest.items():
+            for metric_key, value in metrics.items():
+                row = index.get((device_id, metric_key))
+                if row is not None and value is not None:
+                    values[row] = value
+        return values
+
+    def evaluate(self, values: np.ndarray) -> EngineResult:
+        """Advance the state arrays by one cycle and return the rows to report."""
+
+        was = self.breached
+        previous = self.direction
+        has_value = ~np.isnan(values)
+        has_upper = ~np.isnan(self.max_value)
+        has_lower = ~np.isnan(self.min_value)
+        release_high = self.max_value - self.hysteresis
+        release_low = self.min_value + self.hysteresis
+
+        with np.errstate(invalid="ignore"):
+            # Breached: stays breached until the value is back inside the hysteresis band.
+            upper_clear = ~has_upper | (values <= release_high)
+            lower_clear = ~has_lower | (values >= release_low)
+            cleared = upper_clear & lower_clear
+            near_high = has_upper & (values >= release_high)
+            near_low = has_lower & (values <= release_low)
+            # Not breached: trips only outside the raw bounds.
+            over = has_upper & (values > self.max_value)
+            under = has_lower & (values < self.min_value)
+
+        held = np.where(near_high, HIGH, np.where(near_low, LOW, previous))
+        held = np.where(held == NO_DIRECTION, HIGH, held)
+        tripped = np.where(over, HIGH, np.where(under, LOW, NO_DIRECTION))
+
+        breached = np.where(was, ~cleared, over | under)
+        direction = np.where(was, np.where(cleared, NO_DIRECTION, held), tripped)
+        # Without a sample the state carries over unchanged (and a breached pair is re-reported).
+        breached = np.where(has_value, breached, was)
+        direction = np.where(has_value, direction, previous).astype(np.int8)
+
+        transition = breached != was
+        rows = np.flatnonzero(transition | breached)
+        self.breached = breached
+        self.direction = direction
+        return EngineResult(rows=rows, breached=breached[rows], direction=direction[rows], transition=transition[rows])
@@ -1,26 +1,40 @@
 """Threshold evaluation worker.
 
 Watches telemetry in InfluxDB, compares against device thresholds, and posts alert updates
-back to the API via internal endpoints.
+back to the API via internal endpoints. All network I/O runs on one asyncio loop; the MQTT
+client of stream mode keeps its own network thread.
 """
 from __future__ import annotations
 
+import asyncio
+import json
 import logging
+import math
 import os
 import signal
+import threading
 import time
 from dataclasses import dataclass
-from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
 from uuid import UUID
 
+import aiohttp
 import httpx
-from influxdb_client import InfluxDBClient
+import paho.mqtt.client as mqtt
 from influxdb_client.client.exceptions import InfluxDBError
+from influxdb_client.client.influxdb_client_async import InfluxDBClientAsync
 from pydantic import BaseModel, ValidationError
 
+from engine import DIRECTION_NAMES, ThresholdEngine
+from windows import RollingWindow
+
 logging.basicConfig(level=logging.INFO, format="[worker] %(message)s")
 logger = logging.getLogger(__name__)
 
+# How long shutdown waits for in-flight evaluations before closing the clients.
+SHUTDOWN_GRACE_SEC = 5.0
+
 
 @dataclass(frozen=True)
 class MetricDefinition:
@@ -28,6 +42,15 @@ class MetricDefinition:
     unit: str
 
 
+@dataclass(frozen=True)
+class SentState:
+    """What the API last received for a breached series, and when (epoch seconds)."""
+
+    value: float | None
+    direction: Optional[str]
+    at: float
+
+
 METRIC_DEFINITIONS: Dict[str, MetricDefinition] = {
     "temp_c": MetricDefinition("Temperature", "°C"),
     "humidity_pct": MetricDefinition("Humidity", "%"),
@@ -43,6 +66,13 @@ class ThresholdConfig(BaseModel):
     max_value: float | None = None
     hysteresis: float | None = None
     enabled: bool = True
+    # "last", or "mean"/"min"/"max" of the samples in the trailing window_sec seconds.
+    aggregate: str = "last"
+    window_sec: int | None = None
+
+    @property
+    def windowed(self) -> bool:
+        return self.aggregate != "last" and bool(self.window_sec)
 
 
 class DeviceSnapshot(BaseModel):
@@ -55,10 +85,14 @@ class DeviceSnapshot(BaseModel):
 class ActiveAlert(BaseModel):
     device_id: UUID
     metric_key: str
+    status: str = "open"
 
 
 class MonitoringSnapshot(BaseModel):
+    version: str | None = None
+    full: bool = True
     devices: List[DeviceSnapshot]
+    removed_devices: List[UUID] = []
     active_alerts: List[ActiveAlert] = []
 
 
@@ -78,151 +112,600 @@ class AlertEvaluationBatch(BaseModel):
     items: List[AlertEvaluation]
 
 
+class TelemetryMessage(BaseModel):
+    ts: datetime | None = None
+    metrics: Dict[str, float | None]
+
+
 class WorkerService:
     def __init__(self) -> None:
         self.interval = int(os.getenv("WORKER_INTERVAL_SEC", "10"))
+        # "poll" evaluates from Influx every interval; "stream" evaluates each MQTT sample as it
+        # arrives and keeps the Influx sweep as a WORKER_RECONCILE_SEC safety net.
+        self.mode = os.getenv("WORKER_MODE", "poll").strip().lower()
+        self.reconcile_interval = int(os.getenv("WORKER_RECONCILE_SEC", "300"))
+        self.flush_interval = float(os.getenv("WORKER_STREAM_FLUSH_SEC", "0.2"))
+        # Replicas split the fleet: each evaluates only devices hashing to its shard_index.
+        self.shard_count = max(int(os.getenv("WORKER_SHARD_COUNT", "1")), 1)
+        self.shard_index = int(os.getenv("WORKER_SHARD_INDEX", "0"))
+        if not 0 <= self.shard_index < self.shard_count:
+            raise ValueError(f"WORKER_SHARD_INDEX must be in [0, {self.shard_count})")
+        # Devices per Flux query; keeps the contains() set and the response size bounded.
+        self.query_chunk_size = max(int(os.getenv("WORKER_QUERY_CHUNK_SIZE", "1000")), 1)
+        # Chunk queries in flight at once; bounds the load one cycle puts on Influx.
+        self.query_concurrency = max(int(os.getenv("WORKER_QUERY_CONCURRENCY", "4")), 1)
+        # A still-breached alert is re-sent only when its value moved by more than this fraction,
+        # or when its last report is older than the heartbeat; transitions are always sent.
+        self.min_value_change = float(os.getenv("WORKER_MIN_VALUE_CHANGE", "0.01"))
+        self.heartbeat_interval = int(os.getenv("WORKER_HEARTBEAT_SEC", "300"))
+        # Per-series state survives restarts here (a named volume under Compose); empty disables it.
+        self.state_path = os.getenv("WORKER_STATE_PATH", f"/var/lib/worker/worker-state-{self.shard_index}.json").strip()
         api_base = os.getenv("INTERNAL_API_URL", "http://api:4000").rstrip("/")
         self.snapshot_url = f"{api_base}/internal/monitoring/snapshot"
         self.evaluations_url = f"{api_base}/internal/alerts/evaluations"
 
-        self.http = httpx.Client(timeout=10.0)
-
-        influx_url = os.getenv("INFLUX_URL", "http://influxdb:8086")
-        influx_org = os.getenv("INFLUX_ORG", "iot-org")
-        influx_token = os.getenv("INFLUX_TOKEN", "dev-token")
+        self.influx_url = os.getenv("INFLUX_URL", "http://influxdb:8086")
+        self.influx_org = os.getenv("INFLUX_ORG", "iot-org")
+        self.influx_token = os.getenv("INFLUX_TOKEN", "dev-token")
         self.influx_bucket = os.getenv("INFLUX_BUCKET", "iot_telemetry")
-        self.influx = InfluxDBClient(url=influx_url, token=influx_token, org=influx_org)
-        self.query_api = self.influx.query_api()
-
+        # Async clients bind to the running loop, so they are opened in _main().
+        self.http: httpx.AsyncClient | None = None
+        self.influx: InfluxDBClientAsync | None = None
+        self.query_api = None
+
+        self.mqtt_client: mqtt.Client | None = None
+        if self.mode == "stream":
+            self.mqtt_host = os.getenv("MQTT_HOST", "mosquitto")
+            self.mqtt_port = int(os.getenv("MQTT_PORT", "1883"))
+            prefix = os.getenv("MQTT_TOPIC_PREFIX", "iot").strip("/")
+            self.mqtt_topic = f"{prefix or 'iot'}/+/telemetry"
+            self.mqtt_client = mqtt.Client(client_id=f"iot-worker-{self.shard_index}")
+            username = os.getenv("MQTT_USERNAME") or None
+            password = os.getenv("MQTT_PASSWORD") or None
+            if username and password:
+                self.mqtt_client.username_pw_set(username, password)
+            self.mqtt_client.on_connect = self.on_connect
+            self.mqtt_client.on_message = self.on_message
+
+        # Guards devices/alert state, shared by the MQTT thread and the main loop in stream mode.
+        self._state_lock = threading.Lock()
+        self._pending: List[AlertEvaluation] = []
+        self.devices: Dict[UUID, DeviceSnapshot] = {}
+        # Rebuilt lazily whenever the device set or thresholds change.
+        self.engine: ThresholdEngine | None = None
+        self.snapshot_version: str | None = None
+        # Set when the API missed a batch; cleared once a full snapshot has been applied.
+        self._resync_needed = False
         self.active_alerts: Dict[Tuple[UUID, str], None] = {}
         self.alert_directions: Dict[Tuple[UUID, str], Optional[str]] = {}
+        self.last_sent: Dict[Tuple[UUID, str], SentState] = {}
+        self._state_dirty = False
+        self.windows: Dict[Tuple[UUID, str], RollingWindow] = {}
+        # Evaluations of the previous cycle, still being posted while the next cycle fetches.
+        self._submission: asyncio.Task | None = None
+        self._main_task: asyncio.Task | None = None
         self._stopping = False
 
     def run(self) -> None:
-        logger.info("alert worker online (interval=%ss)", self.interval)
-        signal.signal(signal.SIGTERM, self.stop)
-        signal.signal(signal.SIGINT, self.stop)
-        while not self._stopping:
-            start = time.perf_counter()
-            try:
-                self._run_cycle()
-            except Exception:  # noqa: BLE001
-                logger.exception("evaluation cycle failed")
-            elapsed = time.perf_counter() - start
-            sleep_for = max(self.interval - elapsed, 1)
-            time.sleep(sleep_for)
-        self.shutdown()
+        asyncio.run(self._main())
+
+    async def _main(self) -> None:
+        logger.info(
+            "alert worker online (mode=%s, interval=%ss, shard=%s/%s)",
+            self.mode,
+            self.interval,
+            self.shard_index,
+            self.shard_count,
+        )
+        loop = asyncio.get_running_loop()
+        self._main_task = asyncio.current_task()
+        loop.add_signal_handler(signal.SIGTERM, self.stop)
+        loop.add_signal_handler(signal.SIGINT, self.stop)
+        self.http = httpx.AsyncClient(timeout=10.0)
+        self.influx = InfluxDBClientAsync(url=self.influx_url, token=self.influx_token, org=self.influx_org)
+        self.query_api = self.influx.query_api()
+        self._load_state()
+        try:
+            if self.mqtt_client is not None:
+                await self._run_streaming()
+            else:
+                await self._run_polling()
+        except asyncio.CancelledError:
+            if not self._stopping:
+                raise
+            # Our own stop(): clear the request so shutdown() can still await the drain.
+            self._main_task.uncancel()
+        finally:
+            await self.shutdown()
 
     def stop(self, *_: object) -> None:
         if self._stopping:
             return
         logger.info("stopping alert worker")
         self._stopping = True
+        # Interrupts whatever the loop awaits (sleep, query, request); shutdown() then drains.
+        if self._main_task is not None:
+            self._main_task.cancel()
 
-    def shutdown(self) -> None:
+    async def shutdown(self) -> None:
         logger.info("shutting down resources")
         try:
-            self.http.close()
+            # Give evaluations already computed a bounded chance to reach the API.
+            await asyncio.wait_for(self._drain(), timeout=SHUTDOWN_GRACE_SEC)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("dropping unsent evaluations on shutdown: %s", exc or type(exc).__name__)
+        self._save_state()
+        try:
+            if self.mqtt_client is not None:
+                self.mqtt_client.loop_stop()
+                self.mqtt_client.disconnect()
+            if self.http is not None:
+                await self.http.aclose()
         finally:
-            self.influx.close()
+            if self.influx is not None:
+                await self.influx.close()
 
-    # Core cycle -------------------------------------------------------
-    def _run_cycle(self) -> None:
-        snapshot = self._fetch_snapshot()
-        if snapshot is None or not snapshot.devices:
+    async def _drain(self) -> None:
+        await self._finish_submission()
+        await self._flush_pending()
+
+    async def _run_polling(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            try:
+                await self._run_cycle()
+            except Exception:  # noqa: BLE001
+                logger.exception("evaluation cycle failed")
+            elapsed = loop.time() - start
+            await asyncio.sleep(max(self.interval - elapsed, 1))
+
+    # Streaming mode ---------------------------------------------------
+    async def _run_streaming(self) -> None:
+        assert self.mqtt_client is not None
+        loop = asyncio.get_running_loop()
+        # Thresholds must be known before samples arrive.
+        await self._refresh_snapshot()
+        # The network thread connects (and reconnects) without blocking the loop.
+        self.mqtt_client.connect_async(self.mqtt_host, self.mqtt_port, keepalive=60)
+        self.mqtt_client.loop_start()
+        next_snapshot = loop.time() + self.interval
+        next_sweep = loop.time() + self.reconcile_interval
+        while True:
+            try:
+                await self._flush_pending()
+                now = loop.time()
+                if now >= next_sweep:
+                    await self._run_cycle()
+                    # Stream transitions queued meanwhile must not overtake the sweep's batch.
+                    await self._finish_submission()
+                    next_sweep = now + self.reconcile_interval
+                    next_snapshot = now + self.interval
+                elif now >= next_snapshot:
+                    await self._refresh_snapshot()
+                    self._save_state()
+                    next_snapshot = now + self.interval
+            except Exception:  # noqa: BLE001
+                logger.exception("streaming loop iteration failed")
+            await asyncio.sleep(self.flush_interval)
+
+    def on_connect(self, client: mqtt.Client, _userdata: object, _flags: dict, rc: int) -> None:
+        if rc != 0:
+            logger.error("failed to connect to MQTT: rc=%s", rc)
+            return
+        client.subscribe(self.mqtt_topic)
+        logger.info("subscribed to %s", self.mqtt_topic)
+
+    def on_message(self, _client: mqtt.Client, _userdata: object, msg: mqtt.MQTTMessage) -> None:
+        try:
+            _, raw_device_id, suffix = msg.topic.split("/", 2)
+            device_id = UUID(raw_device_id)
+            message = TelemetryMessage.model_validate_json(msg.payload)
+        except (ValueError, ValidationError):
+            return
+        if suffix != "telemetry":
+            return
+        metrics = {key: value for key, value in message.metrics.items() if value is not None}
+        if metrics:
+            ts = message.ts.timestamp() if message.ts else time.time()
+            self._evaluate_sample(device_id, metrics, ts)
+
+    def _evaluate_sample(self, device_id: UUID, metrics: Dict[str, float], ts: float) -> None:
+        """Evaluate one sample against the device's thresholds and queue what the API must see."""
+
+        with self._state_lock:
+            device = self.devices.get(device_id)
+            if device is None:
+                return
+            for threshold in device.thresholds:
+                if threshold.metric_key not in metrics:
+                    continue
+                key = (device_id, threshold.metric_key)
+                was_breached = key in self.active_alerts
+                value = metrics[threshold.metric_key]
+                if threshold.windowed:
+                    value = self._window_value(key, threshold, ts, value)
+                evaluation = self._evaluate_threshold(device, threshold, value)
+                if evaluation is None:
+                    continue
+                transition = evaluation.breached != was_breached
+                if not self._should_report(key, evaluation.breached, transition, evaluation.value, time.time()):
+                    continue
+                self._pending.append(evaluation)
+                # Applied now so the next sample sees the new state even before the flush.
+                self._update_active_cache([evaluation])
+
+    async def _flush_pending(self) -> None:
+        with self._state_lock:
+            batch, self._pending = self._pending, []
+        if not batch:
             return
+        if not await self._send_evaluations(batch):
+            with self._state_lock:
+                # Retried on the next flush; the API-side upsert/resolve is idempotent.
+                self._pending = batch + self._pending
 
-        self._seed_active_alerts(snapshot.active_alerts)
+    async def _refresh_snapshot(self) -> None:
+        snapshot = await self._fetch_snapshot()
+        if snapshot is not None:
+            with self._state_lock:
+                self._apply_snapshot(snapshot)
 
-        batch: List[AlertEvaluation] = []
-        for device in snapshot.devices:
-            metrics = self._fetch_latest_metrics(device)
-            if not metrics:
-                continue
-            batch.extend(self._evaluate_device(device, metrics))
+    # Core cycle -------------------------------------------------------
+    async def _run_cycle(self) -> None:
+        """Fetch, evaluate and hand the batch to a background submission.
 
-        if batch:
-            self._send_evaluations(batch)
-            self._update_active_cache(batch)
+        The submission overlaps the next cycle's snapshot and telemetry fetch; that cycle awaits
+        it before evaluating, so evaluation always starts from the state the API acknowledged.
+        """
 
-    def _fetch_snapshot(self) -> MonitoringSnapshot | None:
+        snapshot = await self._fetch_snapshot()
+        if snapshot is None:
+            return
+        with self._state_lock:
+            self._apply_snapshot(snapshot)
+            devices = list(self.devices.values())
+
+        latest: Dict[UUID, Dict[str, float]] = {}
+        window_values: Dict[Tuple[UUID, str], float] = {}
+        if devices:
+            slots = asyncio.Semaphore(self.query_concurrency)
+            latest, window_values = await asyncio.gather(
+                self._fetch_latest_metrics(devices, slots),
+                self._fetch_window_aggregates(devices, slots),
+            )
+        await self._finish_submission()
+        if not devices:
+            return
+        with self._state_lock:
+            batch = self._evaluate_all(latest, window_values)
+        if batch:
+            self._submission = asyncio.create_task(self._submit(batch))
+        self._save_state()
+
+    async def _submit(self, batch: List[AlertEvaluation]) -> None:
+        sent = await self._send_evaluations(batch)
+        with self._state_lock:
+            if sent:
+                self._update_active_cache(batch)
+            else:
+                # The API never saw these transitions; resync from a full snapshot next cycle. A
+                # flag rather than clearing snapshot_version, which a delta fetch already in flight
+                # would overwrite when it is applied.
+                self._resync_needed = True
+
+    async def _finish_submission(self) -> None:
+        task, self._submission = self._submission, None
+        if task is not None:
+            await task
+
+    async def _fetch_snapshot(self) -> MonitoringSnapshot | None:
+        params: Dict[str, str | int] = {"shard_index": self.shard_index, "shard_count": self.shard_count}
+        if self.snapshot_version and not self._resync_needed:
+            params["since"] = self.snapshot_version
         try:
-            response = self.http.get(self.snapshot_url)
+            response = await self.http.get(self.snapshot_url, params=params)
             response.raise_for_status()
             return MonitoringSnapshot.model_validate(response.json())
         except (httpx.HTTPError, ValidationError) as exc:
             logger.error("failed to fetch monitoring snapshot: %s", exc)
             return None
 
+    def _apply_snapshot(self, snapshot: MonitoringSnapshot) -> None:
+        """Replace the cached devices and alerts on a full snapshot, or merge a delta into them."""
+
+        if snapshot.full or snapshot.devices or snapshot.removed_devices:
+            self.engine = None
+        if snapshot.full:
+            self.devices = {device.device_id: device for device in snapshot.devices}
+            self._seed_active_alerts(snapshot.active_alerts)
+        else:
+            for device in snapshot.devices:
+                self.devices[device.device_id] = device
+            for device_id in snapshot.removed_devices:
+                self.devices.pop(device_id, None)
+            self._merge_active_alerts(snapshot.active_alerts)
+        if snapshot.full or snapshot.devices or snapshot.removed_devices:
+            self._prune_windows()
+        self.snapshot_version = snapshot.version
+        if snapshot.full:
+            self._resync_needed = False
+        if snapshot.full or snapshot.devices or snapshot.removed_devices or snapshot.active_alerts:
+            logger.info(
+                "applied %s snapshot (%s devices, %s removed, %s alerts)",
+                "full" if snapshot.full else "delta",
+                len(snapshot.devices),
+                len(snapshot.removed_devices),
+                len(snapshot.active_alerts),
+            )
+
+    def _prune_windows(self) -> None:
+        # Drop windows of devices or rules that no longer exist; changed windows restart empty.
+        for key in list(self.windows):
+            device = self.devices.get(key[0])
+            threshold = next((item for item in device.thresholds if item.metric_key == key[1]), None) if device else None
+            if threshold is None or not threshold.windowed or threshold.window_sec != self.windows[key].window_sec:
+                del self.windows[key]
+
+    def _window_value(self, key: Tuple[UUID, str], threshold: ThresholdConfig, ts: float, value: float) -> float | None:
+        """Feed one streamed sample into the pair's window and return the rule's aggregate."""
+
+        window = self.windows.get(key)
+        if window is None:
+            window = self.windows[key] = RollingWindow(threshold.window_sec)
+        window.add(ts, value)
+        return window.aggregate(threshold.aggregate)
+
     def _seed_active_alerts(self, alerts: Iterable[ActiveAlert]) -> None:
-        self.active_alerts = {}
-        self.alert_directions = {}
+        # The API decides which alerts are active; what we already know about them (direction,
+        # last value sent) is kept so a full resync neither resets hysteresis nor re-sends them.
+        active: Dict[Tuple[UUID, str], None] = {(alert.device_id, alert.metric_key): None for alert in alerts}
+        self.alert_directions = {key: self.alert_directions.get(key) for key in active}
+        self.last_sent = {key: sent for key, sent in self.last_sent.items() if key in active}
+        self.active_alerts = active
+        self._state_dirty = True
+
+    def _merge_active_alerts(self, alerts: Iterable[ActiveAlert]) -> None:
+        # Directions of alerts that stay active are kept, so hysteresis carries across cycles.
         for alert in alerts:
             key = (alert.device_id, alert.metric_key)
-            self.active_alerts[key] = None
-            self.alert_directions[key] = None
+            if alert.status == "resolved":
+                self.active_alerts.pop(key, None)
+                self.alert_directions.pop(key, None)
+                self.last_sent.pop(key, None)
+                self._state_dirty = True
+            elif key not in self.active_alerts:
+                self.active_alerts[key] = None
+                self.alert_directions[key] = None
 
-    def _fetch_latest_metrics(self, device: DeviceSnapshot) -> Dict[str, float]:
-        flux = f'''
+    async def _fetch_latest_metrics(
+        self,
+        devices: Iterable[DeviceSnapshot],
+        slots: asyncio.Semaphore,
+    ) -> Dict[UUID, Dict[str, float]]:
+        """Latest value per (device, metric) for every monitored device, one query per chunk.
+
+        Chunk queries share ``slots``, so at most ``query_concurrency`` of them run at once.
+        """
+
+        device_ids: List[str] = []
+        metric_keys: set[str] = set()
+        for device in devices:
+            watched = [
+                threshold.metric_key
+                for threshold in device.thresholds
+                if threshold.enabled and (threshold.min_value is not None or threshold.max_value is not None)
+            ]
+            if watched:
+                device_ids.append(str(device.device_id))
+                metric_keys.update(watched)
+
+        results = await asyncio.gather(
+            *(self._query_chunk(self._latest_flux(chunk, metric_keys), len(chunk), slots) for chunk in self._chunks(device_ids))
+        )
+
+        latest: Dict[UUID, Dict[str, float]] = {}
+        for samples in results:
+            for device_id, key, value in samples:
+                latest.setdefault(device_id, {})[key] = value
+        return latest
+
+    async def _fetch_window_aggregates(
+        self,
+        devices: Iterable[DeviceSnapshot],
+        slots: asyncio.Semaphore,
+    ) -> Dict[Tuple[UUID, str], float]:
+        """Aggregate of every window rule over its trailing window, computed by Influx.
+
+        A poll only sees the latest sample, so a window fed once per cycle would miss whatever
+        happened between cycles; Influx aggregates every sample instead. One query per
+        (window, aggregate) pair and chunk of devices.
+        """
+
+        rules: Dict[Tuple[int, str], Dict[str, set[str]]] = {}
+        for device in devices:
+            for threshold in device.thresholds:
+                if not threshold.enabled or not threshold.windowed:
+                    continue
+                if threshold.min_value is None and threshold.max_value is None:
+                    continue
+                watched = rules.setdefault((threshold.window_sec, threshold.aggregate), {})
+                watched.setdefault(str(device.device_id), set()).add(threshold.metric_key)
+
+        queries: List[Tuple[Dict[str, set[str]], str, int]] = []
+        for (window_sec, aggregate), watched in rules.items():
+            metric_keys = set().union(*watched.values())
+            for chunk in self._chunks(list(watched)):
+                queries.append((watched, self._window_flux(chunk, metric_keys, window_sec, aggregate), len(chunk)))
+        results = await asyncio.gather(*(self._query_chunk(flux, count, slots) for _, flux, count in queries))
+
+        aggregates: Dict[Tuple[UUID, str], float] = {}
+        for (watched, _, _), samples in zip(queries, results):
+            for device_id, key, value in samples:
+                # A chunk queries the union of its devices' metrics; keep only this rule's pairs.
+                if key in watched.get(str(device_id), ()):
+                    aggregates[(device_id, key)] = value
+        return aggregates
+
+    def _chunks(self, device_ids: List[str]) -> List[List[str]]:
+        return [device_ids[start : start + self.query_chunk_size] for start in range(0, len(device_ids), self.query_chunk_size)]
+
+    async def _query_chunk(self, flux: str, device_count: int, slots: asyncio.Semaphore) -> List[Tuple[UUID, str, float]]:
+        """(device_id, metric, value) of every table one chunk query returns."""
+
+        samples: List[Tuple[UUID, str, float]] = []
+        async with slots:
+            try:
+                # query_stream parses records as they arrive instead of materialising every table.
+                records = await self.query_api.query_stream(flux)
+                async for record in records:
+                    raw_device_id = record.values.get("device_id")
+                    key = record.values.get("metric")
+                    if not raw_device_id or not key:
+                        continue
+                    try:
+                        device_id = UUID(raw_device_id)
+                    except ValueError:
+                        continue
+                    samples.append((device_id, key, record.get_value()))
+            except (InfluxDBError, aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                logger.error("failed to query telemetry for %s devices: %s", device_count, exc)
+        return samples
+
+    def _latest_flux(self, device_ids: List[str], metric_keys: Iterable[str]) -> str:
+        return self._telemetry_flux(device_ids, metric_keys, "-30d") + "  |> last()\n"
+
+    def _window_flux(self, device_ids: List[str], metric_keys: Iterable[str], window_sec: int, aggregate: str) -> str:
+        # aggregate is one of mean/min/max, which the API validates; all three are Flux functions.
+        return self._telemetry_flux(device_ids, metric_keys, f"-{window_sec}s") + f"  |> {aggregate}()\n"
+
+    def _telemetry_flux(self, device_ids: List[str], metric_keys: Iterable[str], start: str) -> str:
+        device_set = ", ".join(f'"{device_id}"' for device_id in device_ids)
+        metric_set = ", ".join(f'"{key}"' for key in sorted(metric_keys))
+        return f'''
 from(bucket: "{self.influx_bucket}")
-  |> range(start: -30d)
+  |> range(start: {start})
   |> filter(fn: (r) => r._measurement == "telemetry")
-  |> filter(fn: (r) => r.tenant_id == "{device.tenant_id}" and r.device_id == "{device.device_id}")
-  |> keep(columns: ["_time", "_value", "metric"])
-  |> group(columns: ["metric"])
-  |> last()
+  |> filter(fn: (r) => contains(value: r.device_id, set: [{device_set}]))
+  |> filter(fn: (r) => contains(value: r.metric, set: [{metric_set}]))
+  |> keep(columns: ["_time", "_value", "device_id", "metric"])
+  |> group(columns: ["device_id", "metric"])
 '''
-        try:
-            tables = self.query_api.query(flux)
-        except InfluxDBError as exc:  # noqa: BLE001
-            logger.error("failed to query telemetry for %s: %s", device.device_id, exc)
-            return {}
-
-        metrics: Dict[str, float] = {}
-        for table in tables:
-            for record in table.records:
-                key = record.values.get("metric")
-                value = record.get_value()
-                if key:
-                    metrics[key] = value
-        return metrics
-
-    def _evaluate_device(self, device: DeviceSnapshot, metrics: Dict[str, float]) -> List[AlertEvaluation]:
-        evaluations: List[AlertEvaluation] = []
-        for threshold in device.thresholds:
-            if not threshold.enabled:
-                continue
-            if threshold.min_value is None and threshold.max_value is None:
-                continue
 
-            value = metrics.get(threshold.metric_key)
-            key = (device.device_id, threshold.metric_key)
-            was_breached = key in self.active_alerts
-            previous_direction = self.alert_directions.get(key)
-            breached_state, direction = self._determine_state(value, threshold, was_breached, previous_direction)
-            if breached_state is None:
-                continue
+    def _evaluate_all(
+        self,
+        latest: Dict[UUID, Dict[str, float]],
+        window_values: Mapping[Tuple[UUID, str], float] | None = None,
+    ) -> List[AlertEvaluation]:
+        """Evaluate every monitored pair with the vectorized engine.
+
+        Reports transitions, plus alerts that stay breached when :meth:`_should_report` says
+        the API's copy is stale; pairs that stay clear are not sent, the API would ignore them
+        anyway. Window rules are compared on the aggregate Influx computed over their window, NaN
+        (no data) when the window holds no sample.
+        """
+
+        if self.engine is None:
+            self.engine = ThresholdEngine(self.devices.values())
+        engine = self.engine
+        engine.load_state(self.active_alerts, self.alert_directions)
+        values = engine.gather(latest)
+        window_values = window_values or {}
+        for row in engine.windowed_rows:
+            values[row] = window_values.get(engine.keys[row], float("nan"))
+        now = time.time()
+        reported_values = values.copy()
+        result = engine.evaluate(values)
 
-            message = self._build_message(threshold.metric_key, value, threshold, breached_state, direction)
+        evaluations: List[AlertEvaluation] = []
+        rows = zip(result.rows.tolist(), result.breached.tolist(), result.direction.tolist(), result.transition.tolist())
+        for row, breached, direction_code, transition in rows:
+            key = engine.keys[row]
+            device_id, metric_key = key
+            threshold = engine.thresholds[row]
+            direction = DIRECTION_NAMES[direction_code]
+            value = None if math.isnan(reported_values[row]) else float(reported_values[row])
+            if breached:
+                self.alert_directions[key] = direction
+            else:
+                self.alert_directions.pop(key, None)
+            if not self._should_report(key, breached, transition, value, now):
+                continue
             evaluations.append(
                 AlertEvaluation(
-                    tenant_id=device.tenant_id,
-                    device_id=device.device_id,
-                    metric_key=threshold.metric_key,
+                    tenant_id=engine.tenant_ids[row],
+                    device_id=device_id,
+                    metric_key=metric_key,
                     value=value,
                     threshold_min=threshold.min_value,
                     threshold_max=threshold.max_value,
-                    message=message,
-                    breached=breached_state,
+                    message=self._build_message(metric_key, value, threshold, breached, direction),
+                    breached=breached,
                 )
             )
+        return evaluations
 
-            if breached_state:
-                self.alert_directions[key] = direction
-            else:
-                self.alert_directions.pop(key, None)
+    def _should_report(
+        self,
+        key: Tuple[UUID, str],
+        breached: bool,
+        transition: bool,
+        value: float | None,
+        now: float,
+    ) -> bool:
+        """Whether an evaluation must reach the API.
+
+        Transitions always do. An alert that stays breached is re-sent when its direction
+        flipped, its value moved by more than ``min_value_change`` (relative) since the last
+        report, or that report is older than the heartbeat; otherwise the API row is current.
+        """
+
+        if transition or not breached:
+            return transition
+        sent = self.last_sent.get(key)
+        if sent is None or sent.direction != self.alert_directions.get(key):
+            return True
+        if now - sent.at >= self.heartbeat_interval:
+            return True
+        if value is None or sent.value is None:
+            # A missing sample is not news; a sample after a gap is.
+            return value is not None
+        return value != sent.value and abs(value - sent.value) >= self.min_value_change * abs(sent.value)
+
+    def _evaluate_threshold(
+        self,
+        device: DeviceSnapshot,
+        threshold: ThresholdConfig,
+        value: float | None,
+    ) -> AlertEvaluation | None:
+        if not threshold.enabled:
+            return None
+        if threshold.min_value is None and threshold.max_value is None:
+            return None
 
-        return evaluations
+        key = (device.device_id, threshold.metric_key)
+        was_breached = key in self.active_alerts
+        previous_direction = self.alert_directions.get(key)
+        breached_state, direction = self._determine_state(value, threshold, was_breached, previous_direction)
+        if breached_state is None:
+            return None
+
+        if breached_state:
+            self.alert_directions[key] = direction
+        else:
+            self.alert_directions.pop(key, None)
+
+        message = self._build_message(threshold.metric_key, value, threshold, breached_state, direction)
+        return AlertEvaluation(
+            tenant_id=device.tenant_id,
+            device_id=device.device_id,
+            metric_key=threshold.metric_key,
+            value=value,
+            threshold_min=threshold.min_value,
+            threshold_max=threshold.max_value,
+            message=message,
+            breached=breached_state,
+        )
 
     def _determine_state(
         self,
@@ -273,6 +756,10 @@ from(bucket: "{self.influx_bucket}")
         definition = METRIC_DEFINITIONS.get(metric_key)
         label = definition.label if definition else metric_key
         unit = definition.unit if definition else ""
+        if threshold.windowed:
+            window_sec = threshold.window_sec
+            span = f"{window_sec // 60}m" if window_sec % 60 == 0 else f"{window_sec}s"
+            label = f"{label} {span} {threshold.aggregate}"
         pretty_value = f"{value:.2f}{unit}" if value is not None else f"n/a{unit}".rstrip()
 
         if breached:
@@ -290,23 +777,88 @@ from(bucket: "{self.influx_bucket}")
             window = target_min or target_max or "safe band"
         return f"{label} {pretty_value} within {window}"
 
-    def _send_evaluations(self, evaluations: List[AlertEvaluation]) -> None:
+    async def _send_evaluations(self, evaluations: List[AlertEvaluation]) -> bool:
         batch = AlertEvaluationBatch(items=evaluations)
         try:
-            response = self.http.post(self.evaluations_url, json=batch.model_dump(mode="json"))
+            response = await self.http.post(self.evaluations_url, json=batch.model_dump(mode="json"))
             response.raise_for_status()
             logger.info("submitted %s evaluations", len(evaluations))
+            return True
         except httpx.HTTPError as exc:
             logger.error("failed to submit evaluations: %s", exc)
+            return False
 
     def _update_active_cache(self, evaluations: Iterable[AlertEvaluation]) -> None:
+        now = time.time()
         for evaluation in evaluations:
             key = (evaluation.device_id, evaluation.metric_key)
             if evaluation.breached:
                 self.active_alerts[key] = None
+                self.last_sent[key] = SentState(evaluation.value, self.alert_directions.get(key), now)
             else:
                 self.active_alerts.pop(key, None)
                 self.alert_directions.pop(key, None)
+                self.last_sent.pop(key, None)
+            self._state_dirty = True
+
+    # Persistent state -------------------------------------------------
+    def _load_state(self) -> None:
+        """Restore breached series, their directions and last reports from ``state_path``.
+
+        The first full snapshot still decides which alerts are active; this only spares the
+        restart from re-sending every open alert and from losing hysteresis directions.
+        """
+
+        if not self.state_path:
+            return
+        try:
+            with open(self.state_path, encoding="utf-8") as handle:
+                payload = json.load(handle)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as exc:
+            logger.warning("ignoring unreadable worker state %s: %s", self.state_path, exc)
+            return
+        for item in payload.get("series", []):
+            try:
+                key = (UUID(item["device_id"]), str(item["metric_key"]))
+                direction = item.get("direction")
+                sent_at = item.get("sent_at")
+                self.active_alerts[key] = None
+                self.alert_directions[key] = direction
+                if sent_at is not None:
+                    self.last_sent[key] = SentState(item.get("value"), direction, float(sent_at))
+            except (KeyError, TypeError, ValueError):
+                continue
+        logger.info("restored state for %s breached series from %s", len(self.active_alerts), self.state_path)
+
+    def _save_state(self) -> None:
+        if not self.state_path or not self._state_dirty:
+            return
+        with self._state_lock:
+            series = []
+            for key in self.active_alerts:
+                sent = self.last_sent.get(key)
+                series.append(
+                    {
+                        "device_id": str(key[0]),
+                        "metric_key": key[1],
+                        "direction": self.alert_directions.get(key),
+                        "value": sent.value if sent else None,
+                        "sent_at": sent.at if sent else None,
+                    }
+                )
+            self._state_dirty = False
+        temp_path = f"{self.state_path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+            with open(temp_path, "w", encoding="utf-8") as handle:
+                json.dump({"series": series}, handle)
+            # Atomic swap: a crash mid-write leaves the previous state intact.
+            os.replace(temp_path, self.state_path)
+        except OSError as exc:
+            logger.error("failed to save worker state to %s: %s", self.state_path, exc)
+            self._state_dirty = True
 
 
 def main() -> None:
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import asyncio
+import re
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from main import DeviceSnapshot, ThresholdConfig, WorkerService
+
+DEVICE_ID = uuid.uuid4()
+TENANT_ID = uuid.uuid4()
+
+
+class FakeQueryApi:
+    """Answers the worker's Flux queries from canned tables keyed by the final function."""
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.queries = []
+
+    async def query_stream(self, flux):
+        self.queries.append(flux)
+        function = re.search(r"\|> (\w+)\(\)\s*$", flux).group(1)
+
+        async def records():
+            for device_id, metric, value in self.tables.get(function, ()):
+                yield SimpleNamespace(values={"device_id": str(device_id), "metric": metric}, get_value=lambda v=value: v)
+
+        return records()
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    monkeypatch.setenv("WORKER_STATE_PATH", "")
+    service = WorkerService()
+    service.devices = {
+        DEVICE_ID: DeviceSnapshot(
+            device_id=DEVICE_ID,
+            tenant_id=TENANT_ID,
+            name="Boiler",
+            thresholds=[ThresholdConfig(metric_key="temp_c", max_value=30.0, aggregate="max", window_sec=300)],
+        )
+    }
+    return service
+
+
+def _cycle(worker):
+    async def run():
+        devices = list(worker.devices.values())
+        slots = asyncio.Semaphore(worker.query_concurrency)
+        latest = await worker._fetch_latest_metrics(devices, slots)
+        window_values = await worker._fetch_window_aggregates(devices, slots)
+        return worker._evaluate_all(latest, window_values)
+
+    return asyncio.run(run())
+
+
+def test_poll_mode_compares_the_window_aggregate_from_influx(worker):
+    # The spike happened between polls: the latest sample is back to normal, the window max is not.
+    worker.query_api = FakeQueryApi({"last": [(DEVICE_ID, "temp_c", 21.0)], "max": [(DEVICE_ID, "temp_c", 35.0)]})
+
+    [evaluation] = _cycle(worker)
+
+    assert evaluation.breached
+    assert evaluation.value == 35.0
+    assert any("range(start: -300s)" in query for query in worker.query_api.queries)
+
+
+def test_window_without_samples_is_not_evaluated(worker):
+    worker.query_api = FakeQueryApi({"last": [(DEVICE_ID, "temp_c", 35.0)]})
+
+    assert _cycle(worker) == []
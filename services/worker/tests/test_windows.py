@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import pytest
+
+from windows import RollingWindow
+
+
+def test_empty_window_has_no_aggregate():
+    assert RollingWindow(60).aggregate("mean") is None
+
+
+def test_samples_older_than_the_window_are_evicted():
+    window = RollingWindow(60)
+    for ts, value in ((0, 10.0), (30, 20.0), (60, 30.0)):
+        window.add(ts, value)
+    # (0, 60]: the sample exactly window_sec old is out.
+    assert window.aggregate("mean") == 25.0
+
+    window.add(200, 5.0)
+    assert window.aggregate("mean") == 5.0
+    assert window.aggregate("min") == window.aggregate("max") == 5.0
+
+
+def test_eviction_follows_sample_time_not_the_clock():
+    # Timestamps far from "now" (a skewed device clock) still form a full window.
+    window = RollingWindow(60)
+    window.add(1_000.0, 1.0)
+    window.add(1_050.0, 3.0)
+    assert window.aggregate("mean") == 2.0
+
+
+def test_older_and_repeated_samples_are_ignored():
+    window = RollingWindow(60)
+    assert window.add(10, 1.0)
+    assert not window.add(10, 100.0)
+    assert not window.add(5, 100.0)
+    assert window.aggregate("max") == 1.0
+
+
+@pytest.mark.parametrize("window_sec", [3, 10, 25])
+def test_min_max_and_mean_match_a_brute_force_window(window_sec):
+    values = [5.0, 1.0, 4.0, 4.0, 9.0, 2.0, 6.0, 5.0, 3.0, 8.0, 7.0, 1.0, 0.0, 9.0, 9.0, 2.0]
+    window = RollingWindow(window_sec)
+    for ts, value in enumerate(values, start=1):
+        window.add(ts, value)
+        inside = [item for at, item in enumerate(values[:ts], start=1) if at > ts - window_sec]
+        assert window.aggregate("min") == min(inside)
+        assert window.aggregate("max") == max(inside)
+        assert window.aggregate("mean") == pytest.approx(sum(inside) / len(inside))
+
+
+def test_extremes_are_dropped_when_they_leave_the_window():
+    window = RollingWindow(10)
+    window.add(1, 100.0)
+    window.add(2, -100.0)
+    window.add(5, 7.0)
+    window.add(11, 3.0)
+    assert (window.aggregate("min"), window.aggregate("max")) == (-100.0, 7.0)
+    window.add(12, 4.0)
+    assert (window.aggregate("min"), window.aggregate("max")) == (3.0, 7.0)
+    assert window.aggregate("mean") == pytest.approx(14.0 / 3)
+
+
+def test_mean_restarts_cleanly_after_the_window_empties():
+    window = RollingWindow(10)
+    window.add(1, 0.1)
+    window.add(2, 0.2)
+    window.add(100, 0.7)
+    assert window.aggregate("mean") == 0.7
@@ -0,0 +1,71 @@
+"""Sliding time windows for aggregate threshold rules ("5-minute mean > X", "10-minute max")."""
+from __future__ import annotations
+
+from collections import deque
+from typing import Deque, Tuple
+
+
+class RollingWindow:
+    """Mean, min and max over the samples of the last ``window_sec`` seconds.
+
+    Each sample is appended once and evicted once, and the min/max candidates are kept in
+    monotonic deques, so every operation is O(1) amortized. Memory is bounded by the samples
+    that fit in the window (window_sec x sample rate) per series.
+    """
+
+    __slots__ = ("window_sec", "_samples", "_min", "_max", "_sum", "_seq", "_newest")
+
+    def __init__(self, window_sec: float) -> None:
+        self.window_sec = window_sec
+        self._samples: Deque[Tuple[int, float, float]] = deque()  # (seq, ts, value)
+        self._min: Deque[Tuple[int, float]] = deque()  # (seq, value), values increasing
+        self._max: Deque[Tuple[int, float]] = deque()  # (seq, value), values decreasing
+        self._sum = 0.0
+        self._seq = 0
+        self._newest = float("-inf")
+
+    def add(self, ts: float, value: float) -> bool:
+        """Add a sample taken at ``ts`` (epoch seconds); older or repeated samples are ignored."""
+
+        if ts <= self._newest:
+            return False
+        self._newest = ts
+        self._seq += 1
+        self._samples.append((self._seq, ts, value))
+        self._sum += value
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((self._seq, value))
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((self._seq, value))
+        return True
+
+    def _evict(self, now: float) -> None:
+        cutoff = now - self.window_sec
+        while self._samples and self._samples[0][1] <= cutoff:
+            seq, _, value = self._samples.popleft()
+            self._sum -= value
+            if self._min[0][0] == seq:
+                self._min.popleft()
+            if self._max[0][0] == seq:
+                self._max.popleft()
+        if not self._samples:
+            # Reset so floating-point drift in the running sum cannot accumulate.
+            self._sum = 0.0
+
+    def aggregate(self, kind: str) -> float | None:
+        """``mean``/``min``/``max`` of the samples in ``(newest - window_sec, newest]``; None when empty.
+
+        The window trails the newest sample's own timestamp, not the local clock, so device clock
+        skew and delivery delays cannot shift it.
+        """
+
+        self._evict(self._newest)
+        if not self._samples:
+            return None
+        if kind == "min":
+            return self._min[0][1]
+        if kind == "max":
+            return self._max[0][1]
+        return self._sum / len(self._samples)